@@ -1,3 +1,4 @@
+import argparse
 import os
 import random
 import sqlite3
@@ -6,12 +7,13 @@ from datetime import datetime
 from textwrap import dedent
 from typing import List, Literal, Optional
 
-from datasets import Dataset, Features, Sequence, Value, load_dataset
 from pydantic import BaseModel, Field
 from tqdm import tqdm
 
 
-from utils.database_schema import SQL_CREATE_TABLES, SQL_CREATE_INDEXES_TRIGGERS
+from utils.database_build import build_database
+from utils.database_schema import SQL_CREATE_TABLES
+from utils.email_ingest import SOURCE_TYPES, EmailFilter, EmailRecord, EmailWriter, ingest_sources
 
 # Database configuration
 DB_PATH = "./enron_emails.db"
@@ -21,7 +23,13 @@ SCENARIO_DATASET_REPO_ID = "corbt/enron_emails_sample_questions"    # llm-agent
 # Global database connection
 db_conn = None
 
-expected_features = Features(
+# 허깅페이스 데이터셋을 로드해서 sqlite3로 db를 만들고 sqlite3 db를 접근하며 옳은 대답을 해주는 LLM Agent를 만들것임
+def create_email_database(EMAIL_DATASET_REPO_ID, DB_PATH):
+    """Create the email database from Hugging Face dataset"""
+    # --source maildir|mbox|jsonl는 HF 스택 없이도 돌아가야 하므로 datasets는 여기서만 import한다
+    from datasets import Features, Sequence, Value, load_dataset
+
+    expected_features = Features(
         {
             "message_id": Value("string"),
             "subject": Value("string"),
@@ -34,10 +42,6 @@ expected_features = Features(
             "file_name": Value("string"),
         }
     )
-
-# 허깅페이스 데이터셋을 로드해서 sqlite3로 db를 만들고 sqlite3 db를 접근하며 옳은 대답을 해주는 LLM Agent를 만들것임
-def create_email_database(EMAIL_DATASET_REPO_ID, DB_PATH):
-    """Create the email database from Hugging Face dataset"""
     
     print("Creating email database from Hugging Face dataset...")
     print("This will download and process the full Enron email dataset - this may take several minutes...")
@@ -64,94 +68,79 @@ def create_email_database(EMAIL_DATASET_REPO_ID, DB_PATH):
     conn.execute("PRAGMA journal_mode = MEMORY;")
     conn.execute("BEGIN TRANSACTION;")
     
-    # 4. 전처리 
-    record_count = 0
-    skipped_count = 0
-    duplicate_count = 0
-    processed_emails = set()  # Track (subject, body, from) tuples for deduplication
+    # 4. 전처리 + batch insert (필터와 writer는 로컬 소스 ingestion과 공유)
+    email_filter = EmailFilter()
+    writer = EmailWriter(conn)
 
     for email_data in tqdm(dataset, desc="Inserting emails"):
-        message_id = email_data["message_id"]
-        subject = email_data["subject"]
-        from_address = email_data["from"]
         date_obj: datetime = email_data["date"]
-        body = email_data["body"]
-        file_name = email_data["file_name"]
-        to_list = [str(addr) for addr in email_data["to"] if addr]
-        cc_list = [str(addr) for addr in email_data["cc"] if addr]
-        bcc_list = [str(addr) for addr in email_data["bcc"] if addr]
-
-        # Apply the same filters as the original project
-        total_recipients = len(to_list) + len(cc_list) + len(bcc_list)
-
-        # Filter out very long emails and those with too many recipients
-        if len(body) > 5000:
-            skipped_count += 1
-            continue
-
-        if total_recipients > 30:
-            skipped_count += 1
-            continue
-
-        # Deduplication check (same as original project)
-        email_key = (subject, body, from_address)
-        if email_key in processed_emails:
-            duplicate_count += 1
-            continue
-        else:
-            processed_emails.add(email_key)
-
-        date_str = date_obj.strftime("%Y-%m-%d %H:%M:%S")
-
-        cursor.execute(
-            """
-            INSERT INTO emails (message_id, subject, from_address, date, body, file_name)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """,
-            (message_id, subject, from_address, date_str, body, file_name),
+        record = EmailRecord(
+            message_id=email_data["message_id"],
+            subject=email_data["subject"],
+            from_address=email_data["from"],
+            date=date_obj.strftime("%Y-%m-%d %H:%M:%S"),
+            body=email_data["body"],
+            file_name=email_data["file_name"],
+            to=[str(addr) for addr in email_data["to"] if addr],
+            cc=[str(addr) for addr in email_data["cc"] if addr],
+            bcc=[str(addr) for addr in email_data["bcc"] if addr],
         )
+        if email_filter.accept(record):
+            writer.add(record)
 
-        # Insert recipients
-        recipient_data = []
-        for addr in to_list:
-            recipient_data.append((message_id, addr, "to"))
-        for addr in cc_list:
-            recipient_data.append((message_id, addr, "cc"))
-        for addr in bcc_list:
-            recipient_data.append((message_id, addr, "bcc"))
-
-        if recipient_data:
-            cursor.executemany(
-                """
-                INSERT INTO recipients (email_id, recipient_address, recipient_type)
-                VALUES (?, ?, ?)
-            """,
-                recipient_data,
-            )
-
-        record_count += 1
-
+    writer.flush()
     conn.commit()
 
-    # Create indexes and triggers
+    # Create indexes, FTS and triggers
     print("Creating indexes and FTS...")
-    cursor.executescript(SQL_CREATE_INDEXES_TRIGGERS)
-    cursor.execute('INSERT INTO emails_fts(emails_fts) VALUES("rebuild")')
+    build_database(conn).print()
+
+    print(f"Successfully created database with {writer.record_count} emails.")
+    print(f"Skipped {email_filter.skipped_count} emails due to length/recipient limits.")
+    print(f"Skipped {email_filter.duplicate_count} duplicate emails.")
+    return conn
+
+
+def create_email_database_from_sources(sources, DB_PATH, workers=None):
+    """Create the email database from local maildir / mbox / JSONL sources"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.executescript(SQL_CREATE_TABLES)
+    conn.execute("PRAGMA synchronous = OFF;")
+    conn.execute("PRAGMA journal_mode = MEMORY;")
+    conn.execute("BEGIN TRANSACTION;")
+
+    # 파싱은 process pool, insert는 이 프로세스의 writer 하나가 담당한다 (SQLite는 writer가 하나)
+    email_filter = EmailFilter()
+    writer = EmailWriter(conn)
+    report = ingest_sources(sources, writer, email_filter, workers=workers)
     conn.commit()
 
-    print(f"Successfully created database with {record_count} emails.")
-    print(f"Skipped {skipped_count} emails due to length/recipient limits.")
-    print(f"Skipped {duplicate_count} duplicate emails.")
+    print("Creating indexes and FTS...")
+    build_database(conn).print()
+
+    report.print(writer, email_filter)
     return conn
 
 
 if __name__=="__main__":
-    
-    
+    parser = argparse.ArgumentParser(description="Build the email SQLite database")
+    parser.add_argument("--source", choices=["hf", *SOURCE_TYPES], default="hf")
+    parser.add_argument("--path", nargs="+", default=[], help="maildir roots / mbox files / JSONL files")
+    parser.add_argument("--db", default="./enron_emails.db")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: all CPUs)")
+    args = parser.parse_args()
+
     # Database configuration
-    DB_PATH = "./enron_emails.db"
+    DB_PATH = args.db
     EMAIL_DATASET_REPO_ID = "corbt/enron-emails"        # 허깅페이스에 있는 데이터셋 레포 아이디 
 
-    create_email_database(EMAIL_DATASET_REPO_ID, DB_PATH)
+    if args.source == "hf":
+        create_email_database(EMAIL_DATASET_REPO_ID, DB_PATH)
+    else:
+        if not args.path:
+            parser.error(f"--path is required for --source {args.source}")
+        sources = [SOURCE_TYPES[args.source](path) for path in args.path]
+        create_email_database_from_sources(sources, DB_PATH, workers=args.workers)
 
 
@@ -9,13 +9,20 @@ import shutil
 # Training configuration
 import art
 from art.local import LocalBackend
-from art.utils import iterate_dataset
 from art.langgraph import wrap_rollout
-from art.rewards import ruler_score_group
 
 from tasks.email.scenarios import load_training_scenarios
 from tasks.email.rollout import rollout
 from tasks.email.model import EmailScenario
+from utils.group_filter import GroupFilterStats, filter_zero_signal_groups
+from utils.metrics import StepMetrics
+from utils.ruler_compaction import CompactionStats, ruler_score_group_compact
+from utils.scenario_sampler import AdaptiveScenarioSampler, ScenarioStatsStore
+from utils.run_state import (
+    get_rng_state, hold_run_lock, load_run_state, prune_checkpoints, save_run_state, set_rng_state,
+)
+from utils.scheduler import DurationEstimator, gather_groups_with_quorum
+from utils.trajectory_store import ReplayBuffer, TrajectoryStore
 
 from dotenv import load_dotenv
 
@@ -40,16 +47,42 @@ async def run_training():
         "rollouts_per_group": 4,
         "learning_rate": 1e-5,
         "max_steps": 20,
+        "step_metrics_path": "./logs/step_metrics.jsonl",  # per-step phase timings / metric means
+        # Straggler handling: once `rollout_quorum` rollouts of a group finish, the rest get
+        # `straggler_grace_s` more seconds before being cancelled
+        "rollout_quorum": 3,
+        "rollout_timeout_s": 300,
+        "straggler_grace_s": 10,
+        # Rollouts running at once; groups expected to be slowest (from earlier steps) get slots first
+        "max_concurrent_rollouts": 8,
+        # per-scenario success stats for adaptive sampling; None = <run dir>/scenario_stats.db so stats
+        # stay tied to this run's model (a throwaway run starts from empty stats)
+        "scenario_stats_path": None,
+        # 20 scenarios / 2 groups per step = 10 steps per epoch, so max_steps covers two epochs: the
+        # adaptive sampler can only skip or reweight a scenario on its second visit (next epoch)
+        "training_scenarios": 20,
+        "zero_signal_keep_prob": 0.0,  # fraction of all-same-outcome groups still sent to RULER/training
+        # Persistent run directory: checkpoints + run_state.json survive crashes and restarts.
+        # Set to None for the old throwaway mode (temp dir)
+        "run_dir": "./runs/email-search-agent",
+        "keep_checkpoints": 2,  # newest step checkpoints kept in run_dir
+        # Judged groups are saved to <run_dir>/trajectories; up to `replay_groups_per_step` of the
+        # most informative groups from the last `replay_max_staleness` steps are trained on again
+        "replay_groups_per_step": 1,
+        "replay_max_staleness": 2,
+        "ruler_max_tool_chars": 2000,  # longer tool outputs are truncated in the judge payload
     }
     SCENARIO_DATASET_REPO_ID = "corbt/enron_emails_sample_questions"
 
 
-    # Clean up before starting
+    run_dir = training_config["run_dir"]
+    # Clean up before starting: .art* only holds wrap_rollout's per-rollout LangGraph logs,
+    # run state and checkpoints live in run_dir
     cleanup_art_directories()
     
     ####################  1. Load training scenarios ################### 
     training_scenarios = load_training_scenarios(
-        split="train", limit=50, max_messages=1, shuffle=True, seed=42,
+        split="train", limit=training_config["training_scenarios"], max_messages=1, shuffle=True, seed=42,
         SCENARIO_DATASET_REPO_ID=SCENARIO_DATASET_REPO_ID
     
     )
@@ -69,7 +102,13 @@ async def run_training():
     random.seed(42)
 
     # Use a simpler backend configuration
-    with tempfile.TemporaryDirectory(prefix="art_") as temp_dir:
+    if run_dir:
+        # 같은 run_dir에서 다른 학습/03.eval.py가 LocalBackend를 띄우지 못하게 lock을 잡는다
+        backend_dir = hold_run_lock(run_dir, owner="02.train.py")
+    else:
+        backend_dir = tempfile.TemporaryDirectory(prefix="art_")
+
+    with backend_dir as backend_path:
         
         # Declare the model
         model = art.TrainableModel(
@@ -89,10 +128,10 @@ async def run_training():
             ),
         )
 
-        # Initialize the server with temporary directory
+        # Initialize the server with the run (or temporary) directory
         backend = LocalBackend(
-            in_process=True,  # Keep in process but use temp directory
-            path=temp_dir,
+            in_process=True,
+            path=backend_path,
         )
 
         try:
@@ -105,60 +144,160 @@ async def run_training():
                 weave.init(model.project, settings={"print_call_link": False})
 
             ################### 3. Training Loop ################### 
-            training_iterator = iterate_dataset(
+            rollout_durations = DurationEstimator()  # longest-expected groups are dispatched first
+            filter_totals = GroupFilterStats()
+            trajectory_store = TrajectoryStore(os.path.join(backend_path, "trajectories"))
+            replay_buffer = ReplayBuffer(trajectory_store, max_staleness=training_config["replay_max_staleness"])
+            # Like iterate_dataset, but skips scenarios that are always/never solved and
+            # prefers ones with informative (recent) success rates; stats persist with the run directory
+            scenario_stats = ScenarioStatsStore(
+                training_config["scenario_stats_path"] or os.path.join(backend_path, "scenario_stats.db")
+            )
+            training_iterator = AdaptiveScenarioSampler(
                 training_scenarios,
+                scenario_stats,
                 groups_per_step=training_config["groups_per_step"],
                 num_epochs=training_config["num_epochs"],
+                rollouts_per_group=training_config["rollouts_per_group"],
                 initial_step=await model.get_step(),
+                seed=42,
             )
 
+            # Resume: LocalBackend restores the latest checkpoint, run_state.json the data position.
+            # run_state.json is written before model.train (committed=False) and again after it, so
+            # a crash between the two never makes the resumed run redo a batch the checkpoint has
+            run_state = load_run_state(run_dir) if run_dir else None
+            if run_state:
+                training_iterator.load_state_dict(run_state["sampler"])
+                replay_buffer.load_state_dict(run_state.get("replay", {}))
+                set_rng_state(run_state["rng"])
+                checkpoint_step = await model.get_step()
+                if checkpoint_step != run_state["model_step"]:
+                    if not run_state.get("committed", True) and checkpoint_step == run_state["model_step"] - 1:
+                        print(
+                            f"Warning: training of step {checkpoint_step} was interrupted; its batch is not "
+                            f"retrained (its groups are kept in {trajectory_store.root})"
+                        )
+                    else:
+                        print(
+                            f"Warning: checkpoint step {checkpoint_step} does not match run_state.json "
+                            f"(model step {run_state['model_step']}); batches the checkpoint already "
+                            f"trained on are skipped"
+                        )
+                print(
+                    f"Resuming from {run_dir}: model step {checkpoint_step}, "
+                    f"next batch step {training_iterator.step}, epoch {training_iterator.epoch}"
+                )
+
+            def make_run_state(model_step, committed):
+                # sampler 위치는 이미 다음 batch를 가리킨다 (AdaptiveScenarioSampler.__iter__ 참고)
+                return {
+                    "model_step": model_step,
+                    "committed": committed,
+                    "sampler": training_iterator.state_dict(),
+                    "replay": replay_buffer.state_dict(),
+                    "rng": get_rng_state(),
+                }
+
             for batch in training_iterator:
+                if batch.step > training_config["max_steps"]:
+                    break  # a resumed run that already reached max_steps
+                if batch.step < await model.get_step():
+                    # step N을 학습하면 checkpoint가 N+1이 된다: 이미 학습된 batch (run_state가 뒤처진 경우)
+                    print(f"Skipping batch {batch.step}: already trained into the checkpoint")
+                    continue
                 print(
                     f"Training step {batch.step}, epoch {batch.epoch}, epoch step {batch.epoch_step}"
                 )
-                print(f"Batch contains {len(batch.items)} scenarios")
-
-                # Create trajectory groups for this batch
-                groups = []
-                for scenario in batch.items:
-                    groups.append(
-                        art.TrajectoryGroup(
-                            (
-                                wrap_rollout(model, rollout)(
-                                    model, EmailScenario(step=batch.step, scenario=scenario)
-                                )
-                                for _ in range(training_config["rollouts_per_group"])
-                            )
-                        )
-                    )
-                
-                print(f"Created {len(groups)} trajectory groups")
-                
+                print(
+                    f"Batch contains {len(batch.items)} scenarios "
+                    f"(sampler skipped {training_iterator.scenarios_skipped} saturated scenarios so far, "
+                    f"{training_iterator.rollouts_avoided} rollouts avoided)"
+                )
+
+                # Rollouts for one scenario form a trajectory group; stragglers past the quorum are cancelled
+                def scenario_rollout(scenario, step=batch.step):
+                    return wrap_rollout(model, rollout)(model, EmailScenario(step=step, scenario=scenario))
+
                 # Gather all trajectory groups
-                finished_groups = await art.gather_trajectory_groups(
-                    groups,
-                    pbar_desc="gather",
-                    max_exceptions=training_config["rollouts_per_group"] * len(batch.items),
+                step_metrics = StepMetrics(batch.step)
+                with step_metrics.phase("gather"):
+                    finished_groups, gather_stats = await gather_groups_with_quorum(
+                        batch.items,
+                        scenario_rollout,
+                        rollouts_per_group=training_config["rollouts_per_group"],
+                        quorum=training_config["rollout_quorum"],
+                        rollout_timeout_s=training_config["rollout_timeout_s"],
+                        straggler_grace_s=training_config["straggler_grace_s"],
+                        max_concurrency=training_config["max_concurrent_rollouts"],
+                        max_exceptions=training_config["rollouts_per_group"] * len(batch.items),
+                        durations=rollout_durations,
+                        pbar_desc="gather",
+                    )
+                step_metrics.values.update(gather_stats.as_metrics())
+                print(f"Gathered {len(finished_groups)} trajectory groups")
+                step_metrics.add_trajectory_metrics(finished_groups)
+                scenario_stats.record_groups(finished_groups, step=batch.step)
+                step_metrics.values["rollouts_avoided_by_sampler"] = training_iterator.rollouts_avoided
+
+                # Skip groups whose rollouts all ended the same way: no relative advantage to learn from
+                signal_groups, filter_stats = filter_zero_signal_groups(
+                    finished_groups, keep_prob=training_config["zero_signal_keep_prob"]
                 )
+                filter_totals.merge(filter_stats)
+                step_metrics.values.update(filter_stats.as_metrics())
+                if filter_stats.groups_dropped:
+                    print(
+                        f"Dropped {filter_stats.groups_dropped} zero-signal groups "
+                        f"(saved {filter_stats.judge_calls_saved} RULER calls, {filter_stats.trajectories_saved} trajectories; "
+                        f"run total {filter_totals.judge_calls_saved} / {filter_totals.trajectories_saved})"
+                    )
 
                 judged_groups = []
-                for group in finished_groups:
-                    # Use RULER to assign relative scores to each trajectory
-                    judged_group = await ruler_score_group(group, "openai/o4-mini", debug=True)
+                ruler_stats = CompactionStats()
+                for group in signal_groups:
+                    # Use RULER to assign relative scores to each trajectory (on a compacted copy)
+                    with step_metrics.phase("ruler"):
+                        judged_group, compaction = await ruler_score_group_compact(
+                            group, "openai/o4-mini",
+                            max_tool_chars=training_config["ruler_max_tool_chars"], debug=True,
+                        )
+                    ruler_stats.merge(compaction)
                     if judged_group:
                         judged_groups.append(judged_group)
+                step_metrics.values.update(ruler_stats.as_metrics())
+                if ruler_stats.tokens_before:
+                    print(
+                        f"RULER input ~{ruler_stats.tokens_after} tokens "
+                        f"(was ~{ruler_stats.tokens_before}, -{ruler_stats.reduction:.0%})"
+                    )
 
                 if judged_groups:
-                    await model.delete_checkpoints()
-                    await model.train(
-                        judged_groups,
-                        config=art.TrainConfig(learning_rate=training_config["learning_rate"]),
-                        _config={"logprob_calculation_chunk_size": 16},
-                    )
+                    trajectory_store.append(batch.step, judged_groups)
+                    replay_groups = replay_buffer.sample(batch.step, training_config["replay_groups_per_step"])
+                    step_metrics.values["replayed_groups"] = len(replay_groups)
+                    if replay_groups:
+                        print(f"Mixing {len(replay_groups)} replayed groups into step {batch.step}")
+
+                    if run_dir:
+                        # model.train 직후 crash가 나도 resume이 이 batch를 다시 학습하지 않도록 먼저 기록한다
+                        save_run_state(run_dir, make_run_state(await model.get_step() + 1, committed=False))
+                    with step_metrics.phase("train"):
+                        await model.train(
+                            judged_groups + replay_groups,
+                            config=art.TrainConfig(learning_rate=training_config["learning_rate"]),
+                            _config={"logprob_calculation_chunk_size": 16},
+                        )
+                        prune_checkpoints(backend_path, model, keep_last=training_config["keep_checkpoints"])
                     print(f"Completed training step {batch.step}")
                 else:
                     print(f"No judged groups for step {batch.step}, skipping training")
 
+                step_metrics.log(training_config["step_metrics_path"])
+
+                if run_dir:
+                    save_run_state(run_dir, make_run_state(await model.get_step(), committed=True))
+
                 # Stop after max_steps
                 if batch.step >= training_config["max_steps"]:
                     break
@@ -184,7 +323,7 @@ async def run_training():
             print(f"Error: {e}")
             raise
         finally:
-            # Cleanup happens automatically with temporary directory
+            # Temporary directories are removed automatically; run_dir is kept for resuming
             pass
 
 def main():
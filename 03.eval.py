@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Batch evaluation of the email agent over the test split.
+
+Runs rollout() on every test scenario with bounded concurrency, appends one JSON line per
+scenario to <out-dir>/results.jsonl as soon as it finishes, and skips scenarios already
+evaluated for the same checkpoint step, so an interrupted eval resumes where it stopped.
+Rows recorded with error=1 (endpoint down, connection errors) are retried on resume unless
+--no-retry-errors is given.
+Results go to eval_results/<model-name>/step_<step> by default. Judge verdicts are cached in
+--judge-cache and reused for identical answers across runs and checkpoints.
+
+By default the checkpoint is queried through an already-served OpenAI compatible endpoint,
+so evaluation never touches the training process; --step (the served checkpoint) is then
+required so results of different checkpoints never share a directory. --run-dir loads the
+latest checkpoint in-process instead and refuses to start while a training run holds that
+directory.
+
+    python 03.eval.py --inference-base-url http://localhost:8000/v1 --model-name my-ckpt --step 20
+    python 03.eval.py --run-dir ./runs/email-search-agent          # training must not be running
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import art
+from art.langgraph import wrap_rollout
+from art.local import LocalBackend
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+from tasks.email.model import EmailScenario
+from tasks.email.rollout import rollout
+from tasks.email.scenarios import load_training_scenarios
+from utils.judgement_llm import set_judge_cache
+from utils.run_state import hold_run_lock
+
+
+def count_turns(traj) -> int:
+    """Number of assistant messages (LangChain dicts use type='ai')"""
+    turns = 0
+    for msg in traj.messages_and_choices:
+        if isinstance(msg, dict):
+            if msg.get("role") == "assistant" or msg.get("type") == "ai":
+                turns += 1
+        else:  # Choice
+            turns += 1
+    return turns
+
+
+def load_finished(results_path: str, step: int, retry_errors: bool = True) -> dict:
+    """Rows already evaluated for this checkpoint step (rows of other steps are ignored)
+
+    With retry_errors, failed rollouts (error set) are left out so they are evaluated again
+    instead of being counted as wrong answers.
+    """
+    finished = {}
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    row = json.loads(line)
+                    if row.get("step") != step or (retry_errors and row.get("error")):
+                        continue
+                    finished[row["scenario_id"]] = row
+    return finished
+
+
+def summarize(rows) -> dict:
+    if not rows:
+        return {"scenarios": 0}
+    latencies = sorted(row["latency_s"] for row in rows)
+    return {
+        "scenarios": len(rows),
+        "accuracy": statistics.fmean(row["correct"] for row in rows),
+        "answered": statistics.fmean(row["has_answer"] for row in rows),
+        "errors": sum(row["error"] for row in rows),
+        "mean_turns": statistics.fmean(row["turns"] for row in rows),
+        "mean_search_calls": statistics.fmean(row["search_calls"] for row in rows),
+        "mean_read_calls": statistics.fmean(row["read_calls"] for row in rows),
+        "latency_p50_s": latencies[len(latencies) // 2],
+        "latency_p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+async def build_model(args):
+    if not args.run_dir:
+        # 이미 서빙 중인 체크포인트 (vLLM 등 OpenAI 호환 엔드포인트)
+        model = art.Model(
+            name=args.model_name,
+            project=args.project,
+            inference_model_name=args.model_name,
+            inference_base_url=args.inference_base_url,
+            inference_api_key=os.getenv("INFERENCE_API_KEY", "EMPTY"),
+        )
+        return model, None
+
+    model = art.TrainableModel(name=args.model_name, project=args.project, base_model=args.base_model)
+    model._internal_config = art.dev.InternalModelConfig(
+        init_args=art.dev.InitArgs(max_seq_length=4096),
+        engine_args=art.dev.EngineArgs(enforce_eager=True, gpu_memory_utilization=0.7),
+    )
+    backend = LocalBackend(in_process=True, path=args.run_dir)
+    await model.register(backend)  # serves the latest checkpoint in run_dir
+    return model, backend
+
+
+async def run_eval(args):
+    load_dotenv()
+    set_judge_cache(args.judge_cache)
+
+    scenarios = load_training_scenarios(
+        split=args.split, limit=args.limit, max_messages=args.max_messages,
+        SCENARIO_DATASET_REPO_ID=args.scenario_repo,
+    )
+
+    model, _ = await build_model(args)
+    step = await model.get_step() if isinstance(model, art.TrainableModel) else args.step
+    out_dir = args.out_dir or os.path.join("./eval_results", args.model_name, f"step_{step}")
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, "results.jsonl")
+
+    finished = load_finished(results_path, step, retry_errors=args.retry_errors) if args.resume else {}
+    todo = [s for s in scenarios if s.id not in finished]
+    print(f"Evaluating {args.model_name} step {step} into {out_dir}")
+    print(f"{len(finished)} scenarios already evaluated, {len(todo)} to go")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    pbar = tqdm(total=len(todo), desc="eval")
+
+    with open(results_path, "a" if args.resume else "w") as results_file:
+
+        async def evaluate(scenario):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    traj = await wrap_rollout(model, rollout)(model, EmailScenario(step=step, scenario=scenario))
+                except Exception as e:
+                    print(f"Rollout failed for scenario {scenario.id}: {e}")
+                    traj = None
+                latency = time.perf_counter() - start
+
+            metrics = traj.metrics if traj else {}
+            final_answer = getattr(traj, "final_answer", None)
+            row = {
+                "scenario_id": scenario.id,
+                "step": step,
+                "correct": float(metrics.get("correct", 0.0)),
+                "error": float(metrics.get("error", 0.0) if traj else 1.0),
+                "has_answer": float(final_answer is not None),
+                "answer": final_answer.answer if final_answer else None,
+                "turns": count_turns(traj) if traj else 0,
+                "search_calls": int(metrics.get("search_inbox_tool_calls", 0)),
+                "read_calls": int(metrics.get("read_email_tool_calls", 0)),
+                "judge_cache_hits": int(metrics.get("judge_cache_hits", 0)),
+                "latency_s": round(latency, 3),
+            }
+            # 한 줄씩 바로 기록해서 중단되어도 이어서 평가할 수 있게 한다
+            results_file.write(json.dumps(row) + "\n")
+            results_file.flush()
+            finished[scenario.id] = row
+            pbar.update(1)
+
+        await asyncio.gather(*(evaluate(s) for s in todo))
+    pbar.close()
+
+    summary = summarize(list(finished.values()))
+    summary["step"] = step
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print("\nEvaluation summary")
+    for key, value in summary.items():
+        print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the email agent on the test split")
+    parser.add_argument("--split", default="test", choices=["train", "test"])
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--max-messages", type=int, default=1)
+    parser.add_argument("--scenario-repo", default="corbt/enron_emails_sample_questions")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--out-dir", default=None, help="default: ./eval_results/<model-name>/step_<step>")
+    parser.add_argument("--judge-cache", default="./eval_results/judge_cache.db")
+    parser.add_argument("--no-resume", dest="resume", action="store_false")
+    parser.add_argument("--no-retry-errors", dest="retry_errors", action="store_false",
+                        help="on resume, keep failed rollouts (error=1) instead of evaluating them again")
+    # Model: a served endpoint (default) or, when training is not running, a local run directory
+    parser.add_argument("--inference-base-url", default=os.getenv("INFERENCE_BASE_URL", "http://localhost:8000/v1"))
+    parser.add_argument("--step", type=int, default=None, help="checkpoint step served by the endpoint (required without --run-dir)")
+    parser.add_argument("--run-dir", default=None, help="e.g. ./runs/email-search-agent (same names as 02.train.py)")
+    parser.add_argument("--model-name", default="email-agent-langgraph-test")
+    parser.add_argument("--project", default="email-search-agent-test")
+    parser.add_argument("--base-model", default="Qwen/Qwen2.5-7B-Instruct")
+    args = parser.parse_args()
+    if not args.run_dir and args.step is None:
+        # 기본값을 두면 여러 체크포인트가 같은 step_<n> 결과를 재사용하게 된다
+        parser.error("--step is required when evaluating a served endpoint (or use --run-dir)")
+
+    try:
+        if args.run_dir:
+            # 학습 중인 run_dir에 두 번째 LocalBackend를 띄우지 않는다 (lock이 잡혀 있으면 RuntimeError)
+            with hold_run_lock(args.run_dir, owner="03.eval.py"):
+                asyncio.run(run_eval(args))
+        else:
+            asyncio.run(run_eval(args))
+    except KeyboardInterrupt:
+        print("\nEvaluation interrupted (finished scenarios are saved, rerun to resume)")
+    except Exception as e:
+        print(f"Evaluation failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,528 @@
+"""Microbenchmarks for the email tool hot path (search_emails / read_email).
+
+Build a synthetic corpus, run a query mix against it and compare with a saved baseline:
+
+    python -m tasks.email.bench --build-corpus --db ./bench_emails.db --emails 200000
+    python -m tasks.email.bench --db ./bench_emails.db --threads 1 4 8 --save-baseline bench_baselines/search.json
+    python -m tasks.email.bench --db ./bench_emails.db --threads 1 4 8 --compare bench_baselines/search.json
+
+Query mixes can also be derived from the real scenarios against the real database:
+
+    python -m tasks.email.bench --db ./enron_emails.db --scenarios-split test
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import sqlite3
+import statistics
+import string
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+from utils.database_build import build_database
+from utils.database_schema import SQL_CREATE_TABLES
+from tasks.email.functions import build_search_query, read_email, search_emails
+
+# 에이전트가 실제로 보내는 키워드 개수 분포 (1~4개)
+DEFAULT_KEYWORD_COUNTS = {1: 0.30, 2: 0.45, 3: 0.20, 4: 0.05}
+
+STOPWORDS = {
+    "the", "and", "for", "what", "when", "where", "which", "who", "whom", "was", "were",
+    "did", "does", "with", "from", "that", "this", "have", "has", "about", "into", "your",
+    "our", "are", "how", "many", "much", "there", "their", "they", "will", "would", "been",
+}
+
+
+@dataclass
+class CorpusConfig:
+    num_emails: int = 100_000
+    num_inboxes: int = 2_000
+    vocab_size: int = 30_000
+    term_zipf_s: float = 1.07      # 단어 빈도 분포 (Zipf)
+    inbox_zipf_s: float = 1.2      # 일부 inbox에 메일이 몰리는 분포
+    mean_body_words: int = 120
+    max_body_words: int = 800      # 5000자 필터와 비슷한 상한
+    max_recipients: int = 8
+    start_date: str = "1998-01-01"
+    end_date: str = "2002-12-31"
+    seed: int = 42
+
+
+@dataclass
+class SearchSpec:
+    inbox: str
+    keywords: List[str]
+    sent_before: Optional[str] = None
+
+
+@dataclass
+class LatencyReport:
+    name: str
+    threads: int
+    calls: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    throughput_qps: float
+    empty_results: int = 0
+
+
+@dataclass
+class PlanReport:
+    queries: int
+    full_scans: Dict[str, int] = field(default_factory=dict)  # "SCAN ..." 라인별 등장 횟수
+    mean_vm_steps: float = 0.0
+    p95_vm_steps: float = 0.0
+
+
+def _zipf_cum_weights(n: int, s: float) -> List[float]:
+    cum, total = [], 0.0
+    for rank in range(1, n + 1):
+        total += 1.0 / (rank ** s)
+        cum.append(total)
+    return cum
+
+
+def _make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    """Pronounceable pseudo-words so the FTS tokenizer sees realistic token lengths"""
+    consonants, vowels = "bcdfghjklmnprstvwz", "aeiou"
+    words, seen = [], set()
+    while len(words) < size:
+        syllables = rng.choices([1, 2, 3, 4], weights=[2, 5, 4, 1])[0]
+        word = "".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(syllables))
+        if rng.random() < 0.3:
+            word += rng.choice(consonants)
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def generate_corpus(db_path: str, config: CorpusConfig = CorpusConfig()) -> None:
+    """Create a synthetic email database with the same schema as 01.get_db.py"""
+    rng = random.Random(config.seed)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    vocab = _make_vocabulary(config.vocab_size, rng)
+    term_cum = _zipf_cum_weights(config.vocab_size, config.term_zipf_s)
+    inboxes = [
+        f"{''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))}.{i}@enron.com"
+        for i in range(config.num_inboxes)
+    ]
+    inbox_cum = _zipf_cum_weights(config.num_inboxes, config.inbox_zipf_s)
+
+    start = datetime.strptime(config.start_date, "%Y-%m-%d")
+    span_seconds = int((datetime.strptime(config.end_date, "%Y-%m-%d") - start).total_seconds())
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.executescript(SQL_CREATE_TABLES)
+    conn.execute("PRAGMA synchronous = OFF;")
+    conn.execute("PRAGMA journal_mode = MEMORY;")
+    conn.execute("BEGIN TRANSACTION;")
+
+    print(f"Generating {config.num_emails} synthetic emails into {db_path}...")
+    for i in range(config.num_emails):
+        message_id = f"<bench.{i}@enron.com>"
+        sender = rng.choices(inboxes, cum_weights=inbox_cum)[0]
+        n_words = min(config.max_body_words, max(5, int(rng.expovariate(1 / config.mean_body_words))))
+        body = " ".join(rng.choices(vocab, cum_weights=term_cum, k=n_words))
+        subject = " ".join(rng.choices(vocab, cum_weights=term_cum, k=rng.randint(2, 7)))
+        date_str = (start + timedelta(seconds=rng.randrange(span_seconds))).strftime("%Y-%m-%d %H:%M:%S")
+
+        cursor.execute(
+            "INSERT INTO emails (message_id, subject, from_address, date, body, file_name) VALUES (?, ?, ?, ?, ?, ?)",
+            (message_id, subject, sender, date_str, body, f"bench/{i}."),
+        )
+        n_recipients = min(config.max_recipients, 1 + int(rng.expovariate(1 / 1.5)))
+        recipients = set(rng.choices(inboxes, cum_weights=inbox_cum, k=n_recipients))
+        cursor.executemany(
+            "INSERT INTO recipients (email_id, recipient_address, recipient_type) VALUES (?, ?, ?)",
+            [(message_id, addr, rng.choices(["to", "cc", "bcc"], weights=[8, 2, 1])[0]) for addr in recipients],
+        )
+    conn.commit()
+
+    print("Creating indexes and FTS...")
+    build_database(conn).print()
+    conn.close()
+
+
+def _sample_keyword_count(rng: random.Random, keyword_counts: Dict[int, float]) -> int:
+    return rng.choices(list(keyword_counts), weights=list(keyword_counts.values()))[0]
+
+
+def build_query_mix(
+    db_path: str,
+    num_queries: int = 500,
+    seed: int = 0,
+    keyword_counts: Dict[int, float] = DEFAULT_KEYWORD_COUNTS,
+    miss_rate: float = 0.2,
+) -> List[SearchSpec]:
+    """Sample (inbox, keywords, query_date) triples from the database itself.
+
+    Inboxes are weighted by mailbox size, keywords are taken from an email in that inbox
+    (so most queries hit), and a `miss_rate` fraction uses random terms from another email.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    max_id = conn.execute("SELECT MAX(id) FROM emails").fetchone()[0] or 0
+    if max_id == 0:
+        raise ValueError(f"No emails found in {db_path}")
+
+    specs: List[SearchSpec] = []
+    while len(specs) < num_queries:
+        row = conn.execute(
+            "SELECT message_id, from_address, date, body FROM emails WHERE id = ?",
+            (rng.randint(1, max_id),),
+        ).fetchone()
+        if not row:
+            continue
+        message_id, sender, date, body = row
+        recipients = [r[0] for r in conn.execute(
+            "SELECT recipient_address FROM recipients WHERE email_id = ?", (message_id,)
+        )]
+        inbox = rng.choice([sender] + recipients)
+
+        term_source = body
+        if rng.random() < miss_rate:
+            other = conn.execute(
+                "SELECT body FROM emails WHERE id = ?", (rng.randint(1, max_id),)
+            ).fetchone()
+            term_source = other[0] if other else body
+
+        terms = [w for w in _tokenize(term_source) if w not in STOPWORDS]
+        if not terms:
+            continue
+        k = min(len(terms), _sample_keyword_count(rng, keyword_counts))
+        query_date = (datetime.strptime(date[:10], "%Y-%m-%d") + timedelta(days=rng.randint(1, 180))).strftime("%Y-%m-%d")
+        specs.append(SearchSpec(inbox=inbox, keywords=rng.sample(terms, k), sent_before=query_date))
+
+    conn.close()
+    return specs
+
+
+def _tokenize(text: Optional[str]) -> List[str]:
+    words = "".join(c.lower() if c.isalnum() else " " for c in (text or "")).split()
+    return list(dict.fromkeys(w for w in words if len(w) > 2))
+
+
+def build_query_mix_from_scenarios(
+    scenarios: Sequence,
+    num_queries: int = 500,
+    seed: int = 0,
+    keyword_counts: Dict[int, float] = DEFAULT_KEYWORD_COUNTS,
+) -> List[SearchSpec]:
+    """Derive search queries from Scenario fields (inbox_address, query_date, question)"""
+    rng = random.Random(seed)
+    specs: List[SearchSpec] = []
+    while len(specs) < num_queries:
+        scenario = rng.choice(scenarios)
+        terms = [w for w in _tokenize(scenario.question) if w not in STOPWORDS]
+        if not terms:
+            continue
+        k = min(len(terms), _sample_keyword_count(rng, keyword_counts))
+        specs.append(SearchSpec(
+            inbox=scenario.inbox_address,
+            keywords=rng.sample(terms, k),
+            sent_before=scenario.query_date,
+        ))
+    return specs
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class WorkerThreads:
+    """N long-lived threads; run(fn, shards) calls fn(shards[i]) on thread i and waits.
+
+    Kept alive across measurements so every thread keeps its own warm SQLite connection
+    (get_db_connection is per thread) instead of reconnecting inside the timed region.
+    """
+
+    def __init__(self, n: int):
+        self.queues: List[queue.Queue] = [queue.Queue() for _ in range(n)]
+        self.threads = [threading.Thread(target=self._loop, args=(q,), daemon=True) for q in self.queues]
+        for thread in self.threads:
+            thread.start()
+
+    @staticmethod
+    def _loop(jobs: "queue.Queue") -> None:
+        while (job := jobs.get()) is not None:
+            fn, arg, errors, done = job
+            try:
+                fn(arg)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+    def __len__(self) -> int:
+        return len(self.threads)
+
+    def run(self, fn: Callable[[object], None], shards: Sequence) -> None:
+        errors: List[BaseException] = []
+        done = [threading.Event() for _ in shards]
+        for jobs, shard, event in zip(self.queues, shards, done):
+            jobs.put((fn, shard, errors, event))
+        for event in done:
+            event.wait()
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        for jobs in self.queues:
+            jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+def measure_latency(
+    name: str,
+    fn: Callable[[object], object],
+    workload: Sequence,
+    threads: int = 1,
+    workers: Optional[WorkerThreads] = None,
+    warmup: int = 20,
+    repeats: int = 3,
+) -> LatencyReport:
+    """Run fn over the workload with N threads and report latency percentiles and throughput.
+
+    Each thread first runs `warmup` untimed calls from its shard (connection setup, page cache),
+    then the workload is timed `repeats` times and the percentiles are taken over all passes.
+    """
+    latencies: List[float] = []
+    empty = 0
+    lock = threading.Lock()
+    own_workers = workers is None
+    workers = workers or WorkerThreads(threads)
+    threads = len(workers)
+
+    def warm(items: Sequence) -> None:
+        for item in items[:warmup]:
+            fn(item)
+
+    def worker(items: Sequence) -> None:
+        nonlocal empty
+        local, local_empty = [], 0
+        for item in items:
+            t0 = time.perf_counter()
+            result = fn(item)
+            local.append(time.perf_counter() - t0)
+            if not result:
+                local_empty += 1
+        with lock:
+            latencies.extend(local)
+            empty += local_empty
+
+    shards = [workload[i::threads] for i in range(threads)]
+    try:
+        workers.run(warm, shards)
+        wall_start = time.perf_counter()
+        for _ in range(repeats):
+            workers.run(worker, shards)
+        wall = time.perf_counter() - wall_start
+    finally:
+        if own_workers:
+            workers.close()
+
+    latencies.sort()
+    return LatencyReport(
+        name=name,
+        threads=threads,
+        calls=len(latencies),
+        p50_ms=_percentile(latencies, 50) * 1000,
+        p95_ms=_percentile(latencies, 95) * 1000,
+        p99_ms=_percentile(latencies, 99) * 1000,
+        mean_ms=(statistics.fmean(latencies) * 1000) if latencies else 0.0,
+        throughput_qps=len(latencies) / wall if wall > 0 else 0.0,
+        empty_results=empty,
+    )
+
+
+def explain_search_mix(db_path: str, specs: Sequence[SearchSpec]) -> PlanReport:
+    """Collect EXPLAIN QUERY PLAN output and VM step counts for every query in the mix.
+
+    SQLite does not expose exact rows scanned to Python, so full-table SCAN lines from the
+    plan are counted together with VM instructions executed (via the progress handler)
+    as a proxy for the amount of work a query does.
+    """
+    conn = sqlite3.connect(db_path)
+    full_scans: Dict[str, int] = {}
+    vm_steps: List[int] = []
+    counter = [0]
+
+    def on_progress() -> int:
+        counter[0] += 1
+        return 0
+
+    for spec in specs:
+        sql, params = build_search_query(
+            inbox=spec.inbox, keywords=spec.keywords, sent_before=spec.sent_before
+        )
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[-1]
+            if detail.startswith("SCAN") and "VIRTUAL TABLE" not in detail:
+                full_scans[detail] = full_scans.get(detail, 0) + 1
+
+        counter[0] = 0
+        conn.set_progress_handler(on_progress, 1)
+        conn.execute(sql, params).fetchall()
+        conn.set_progress_handler(None, 0)
+        vm_steps.append(counter[0])
+
+    conn.close()
+    vm_steps.sort()
+    return PlanReport(
+        queries=len(specs),
+        full_scans=full_scans,
+        mean_vm_steps=statistics.fmean(vm_steps) if vm_steps else 0.0,
+        p95_vm_steps=_percentile(vm_steps, 95),
+    )
+
+
+def run_benchmark(
+    db_path: str,
+    specs: List[SearchSpec],
+    threads: Sequence[int] = (1, 4),
+    read_ids_per_query: int = 2,
+    repeats: int = 3,
+) -> Dict:
+    """Run the search_emails and read_email mixes and return a JSON-serialisable report"""
+    # read_email 워크로드: 에이전트처럼 검색 결과 중 일부를 읽는다
+    read_ids: List[str] = []
+    for spec in specs:
+        results = search_emails(inbox=spec.inbox, keywords=spec.keywords, sent_before=spec.sent_before, db_path=db_path)
+        read_ids.extend(r.message_id for r in results[:read_ids_per_query])
+    if not read_ids:
+        read_ids = [row[0] for row in sqlite3.connect(db_path).execute("SELECT message_id FROM emails LIMIT 500")]
+
+    def run_search(spec: SearchSpec):
+        return search_emails(inbox=spec.inbox, keywords=spec.keywords, sent_before=spec.sent_before, db_path=db_path)
+
+    def run_read(message_id: str):
+        return read_email(message_id, db_path=db_path)
+
+    latency = []
+    for n in threads:
+        workers = WorkerThreads(n)
+        try:
+            latency.append(asdict(measure_latency("search_emails", run_search, specs, workers=workers, repeats=repeats)))
+            latency.append(asdict(measure_latency("read_email", run_read, read_ids, workers=workers, repeats=repeats)))
+        finally:
+            workers.close()
+
+    return {
+        "db_path": db_path,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "num_search_queries": len(specs),
+        "num_read_queries": len(read_ids),
+        "latency": latency,
+        "plan": asdict(explain_search_mix(db_path, specs)),
+    }
+
+
+def compare_reports(current: Dict, baseline: Dict, tolerance: float = 0.10, min_delta_ms: float = 0.05) -> List[str]:
+    """Print a side-by-side comparison and return the list of regressions beyond tolerance.
+
+    Latency changes smaller than `min_delta_ms` are timer / scheduler noise (read_email is
+    ~0.05ms) and never count as regressions, whatever their relative size.
+    """
+    regressions = []
+    base_rows = {(r["name"], r["threads"]): r for r in baseline["latency"]}
+    print(f"{'benchmark':<16}{'threads':>8}{'metric':>16}{'baseline':>12}{'current':>12}{'delta':>9}")
+    for row in current["latency"]:
+        base = base_rows.get((row["name"], row["threads"]))
+        if not base:
+            continue
+        for metric, higher_is_better in (("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("throughput_qps", True)):
+            old, new = base[metric], row[metric]
+            delta = (new - old) / old if old else 0.0
+            print(f"{row['name']:<16}{row['threads']:>8}{metric:>16}{old:>12.3f}{new:>12.3f}{delta:>+9.1%}")
+            worse = -delta if higher_is_better else delta
+            if not higher_is_better and new - old <= min_delta_ms:
+                continue
+            if worse > tolerance:
+                regressions.append(f"{row['name']} x{row['threads']} {metric}: {old:.3f} -> {new:.3f} ({delta:+.1%})")
+
+    old_steps, new_steps = baseline["plan"]["mean_vm_steps"], current["plan"]["mean_vm_steps"]
+    if old_steps and (new_steps - old_steps) / old_steps > tolerance:
+        regressions.append(f"mean VM steps per search: {old_steps:.0f} -> {new_steps:.0f}")
+    return regressions
+
+
+def print_report(report: Dict) -> None:
+    print(f"\nsearch queries: {report['num_search_queries']}, read queries: {report['num_read_queries']}")
+    print(f"{'benchmark':<16}{'threads':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'qps':>10}{'empty':>8}")
+    for row in report["latency"]:
+        print(
+            f"{row['name']:<16}{row['threads']:>8}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}"
+            f"{row['p99_ms']:>10.3f}{row['throughput_qps']:>10.1f}{row['empty_results']:>8}"
+        )
+    plan = report["plan"]
+    print(f"\nVM steps per search: mean {plan['mean_vm_steps']:.0f}, p95 {plan['p95_vm_steps']:.0f}")
+    for detail, count in sorted(plan["full_scans"].items(), key=lambda kv: -kv[1]):
+        print(f"  full scan in {count}/{plan['queries']} queries: {detail}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="search_emails / read_email microbenchmarks")
+    parser.add_argument("--db", default="./bench_emails.db")
+    parser.add_argument("--build-corpus", action="store_true", help="(re)generate the synthetic corpus at --db")
+    parser.add_argument("--emails", type=int, default=CorpusConfig.num_emails)
+    parser.add_argument("--inboxes", type=int, default=CorpusConfig.num_inboxes)
+    parser.add_argument("--vocab", type=int, default=CorpusConfig.vocab_size)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios-split", choices=["train", "test"], default=None,
+                        help="derive the query mix from real scenarios instead of the database")
+    parser.add_argument("--save-baseline", default=None, help="write the report as a JSON baseline")
+    parser.add_argument("--compare", default=None, help="compare against a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore latency changes below this")
+    parser.add_argument("--repeats", type=int, default=3, help="timed passes over the query mix")
+    args = parser.parse_args()
+
+    if args.build_corpus:
+        generate_corpus(args.db, CorpusConfig(
+            num_emails=args.emails, num_inboxes=args.inboxes, vocab_size=args.vocab, seed=args.seed,
+        ))
+
+    if args.scenarios_split:
+        from tasks.email.scenarios import load_training_scenarios
+        scenarios = load_training_scenarios(split=args.scenarios_split, max_messages=None)
+        query_mix = build_query_mix_from_scenarios(scenarios, num_queries=args.queries, seed=args.seed)
+    else:
+        query_mix = build_query_mix(args.db, num_queries=args.queries, seed=args.seed)
+
+    report = run_benchmark(args.db, query_mix, threads=args.threads, repeats=args.repeats)
+    print_report(report)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare_reports(report, baseline, tolerance=args.tolerance, min_delta_ms=args.min_delta_ms)
+        if regressions:
+            print("\nRegressions beyond tolerance:")
+            for line in regressions:
+                print(f"  {line}")
+            exit(1)
+        print("\nNo regressions beyond tolerance.")
@@ -1,26 +1,48 @@
 import sqlite3
 import os
-from typing import List, Optional
+import threading
+from typing import List, Optional, Tuple
 from tasks.email.model import Email, SearchResult
+from utils.metrics import record, timed
 
-# Global database connection pool
-_db_connections = {}
+# Per-thread database connections ({db_path: connection}); dropped together with the thread
+_db_local = threading.local()
+
+# Set to the Unix socket of `python -m tasks.email.tool_server` to share one warm index
+TOOL_SERVER_ENV = "EMAIL_TOOL_SERVER"
+_tool_server_client = None
+
+
+def get_tool_server_client():
+    """Client for the local tool server, or None when EMAIL_TOOL_SERVER is not set"""
+    global _tool_server_client
+    socket_path = os.getenv(TOOL_SERVER_ENV)
+    if not socket_path:
+        return None
+    if _tool_server_client is None or _tool_server_client.socket_path != socket_path:
+        from tasks.email.tool_server import ToolServerClient
+        _tool_server_client = ToolServerClient(socket_path)
+    return _tool_server_client
 
 def get_db_connection(db_path: str = "./enron_emails.db"):
     """Get database connection with connection pooling"""
     if not os.path.exists(db_path):
         raise FileNotFoundError(f"Database file not found: {db_path}")
     
-    # Use thread-safe connection pooling
-    thread_id = id(os.getpid())  # Simple thread identification
-    if thread_id not in _db_connections:
+    # Use thread-safe connection pooling: one connection per (thread, db file).
+    # threading.local이라 스레드가 끝나면 연결도 같이 정리된다
+    connections = getattr(_db_local, "connections", None)
+    if connections is None:
+        connections = _db_local.connections = {}
+    if db_path not in connections:
         print(f"Creating new database connection for {db_path}")
-        _db_connections[thread_id] = sqlite3.connect(db_path, check_same_thread=False)
+        connections[db_path] = sqlite3.connect(db_path, check_same_thread=False)
+        record("db_connections_opened")
     
-    return _db_connections[thread_id]
+    return connections[db_path]
 
 
-def search_emails(
+def build_search_query(
     inbox: str,
     keywords: List[str],
     from_addr: Optional[str] = None,
@@ -28,76 +50,113 @@ def search_emails(
     sent_after: Optional[str] = None,
     sent_before: Optional[str] = None,
     max_results: int = 10,
-    db_path: str = "./enron_emails.db",
-) -> List[SearchResult]:
-    """Search the email database based on keywords and filters"""
-    try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
+) -> Tuple[str, List[str | int]]:
+    """Build the SQL and parameters used by search_emails (also used by the benchmarks)"""
+    where_clauses: List[str] = []
+    params: List[str | int] = []
+
+    if not keywords:
+        raise ValueError("No keywords provided for search.")
 
-        where_clauses: List[str] = []
-        params: List[str | int] = []
+    if max_results > 10:
+        raise ValueError("max_results must be less than or equal to 10.")
 
-        if not keywords:
-            raise ValueError("No keywords provided for search.")
+    # FTS5 default is AND, so just join keywords. Escape quotes for safety.
+    fts_query = " ".join(f""" "{k.replace('"', '""')}" """ for k in keywords)
+    where_clauses.append("fts.emails_fts MATCH ?")
+    params.append(fts_query)
 
-        if max_results > 10:
-            raise ValueError("max_results must be less than or equal to 10.")
+    # Inbox filter
+    where_clauses.append("""
+        (e.from_address = ? OR EXISTS (
+            SELECT 1 FROM recipients r_inbox
+            WHERE r_inbox.recipient_address = ? AND r_inbox.email_id = e.message_id
+        ))
+    """)
+    params.extend([inbox, inbox])
 
-        # FTS5 default is AND, so just join keywords. Escape quotes for safety.
-        fts_query = " ".join(f""" "{k.replace('"', '""')}" """ for k in keywords)
-        where_clauses.append("fts.emails_fts MATCH ?")
-        params.append(fts_query)
+    if from_addr:
+        where_clauses.append("e.from_address = ?")
+        params.append(from_addr)
 
-        # Inbox filter
+    if to_addr:
         where_clauses.append("""
-            (e.from_address = ? OR EXISTS (
-                SELECT 1 FROM recipients r_inbox
-                WHERE r_inbox.recipient_address = ? AND r_inbox.email_id = e.message_id
-            ))
+            EXISTS (
+                SELECT 1 FROM recipients r_to
+                WHERE r_to.recipient_address = ? AND r_to.email_id = e.message_id
+            )
         """)
-        params.extend([inbox, inbox])
-
-        if from_addr:
-            where_clauses.append("e.from_address = ?")
-            params.append(from_addr)
-
-        if to_addr:
-            where_clauses.append("""
-                EXISTS (
-                    SELECT 1 FROM recipients r_to
-                    WHERE r_to.recipient_address = ? AND r_to.email_id = e.message_id
-                )
-            """)
-            params.append(to_addr)
-
-        if sent_after:
-            where_clauses.append("e.date >= ?")
-            params.append(f"{sent_after} 00:00:00")
-
-        if sent_before:
-            where_clauses.append("e.date < ?")
-            params.append(f"{sent_before} 00:00:00")
-
-        sql = f"""
-            SELECT
-                e.message_id,
-                snippet(emails_fts, -1, '<b>', '</b>', ' ... ', 15) as snippet
-            FROM
-                emails e JOIN emails_fts fts ON e.id = fts.rowid
-            WHERE
-                {" AND ".join(where_clauses)}
-            ORDER BY
-                e.date DESC
-            LIMIT ?;
-        """
-        params.append(max_results)
+        params.append(to_addr)
+
+    if sent_after:
+        where_clauses.append("e.date >= ?")
+        params.append(f"{sent_after} 00:00:00")
+
+    if sent_before:
+        where_clauses.append("e.date < ?")
+        params.append(f"{sent_before} 00:00:00")
+
+    sql = f"""
+        SELECT
+            e.message_id,
+            snippet(emails_fts, -1, '<b>', '</b>', ' ... ', 15) as snippet
+        FROM
+            emails e JOIN emails_fts fts ON e.id = fts.rowid
+        WHERE
+            {" AND ".join(where_clauses)}
+        ORDER BY
+            e.date DESC
+        LIMIT ?;
+    """
+    params.append(max_results)
+    return sql, params
+
+
+def search_emails(
+    inbox: str,
+    keywords: List[str],
+    from_addr: Optional[str] = None,
+    to_addr: Optional[str] = None,
+    sent_after: Optional[str] = None,
+    sent_before: Optional[str] = None,
+    max_results: int = 10,
+    db_path: str = "./enron_emails.db",
+) -> List[SearchResult]:
+    """Search the email database based on keywords and filters"""
+    kwargs = dict(
+        inbox=inbox, keywords=keywords, from_addr=from_addr, to_addr=to_addr,
+        sent_after=sent_after, sent_before=sent_before, max_results=max_results, db_path=db_path,
+    )
+    client = get_tool_server_client()
+    if client is not None:
+        ok, results = client.search_emails(**kwargs)
+        if ok:
+            return results
+    return search_emails_local(**kwargs)
 
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
 
-        return [SearchResult(message_id=row[0], snippet=row[1]) for row in results]
-        
+def search_emails_local(
+    inbox: str,
+    keywords: List[str],
+    from_addr: Optional[str] = None,
+    to_addr: Optional[str] = None,
+    sent_after: Optional[str] = None,
+    sent_before: Optional[str] = None,
+    max_results: int = 10,
+    db_path: str = "./enron_emails.db",
+) -> List[SearchResult]:
+    """search_emails against this process's own SQLite connection"""
+    try:
+        return query_search_emails(
+            inbox=inbox,
+            keywords=keywords,
+            from_addr=from_addr,
+            to_addr=to_addr,
+            sent_after=sent_after,
+            sent_before=sent_before,
+            max_results=max_results,
+            db_path=db_path,
+        )
     except sqlite3.Error as e:
         print(f"Database error in search_emails: {e}")
         return []
@@ -106,15 +165,75 @@ def search_emails(
         return []
 
 
+def query_search_emails(
+    inbox: str,
+    keywords: List[str],
+    from_addr: Optional[str] = None,
+    to_addr: Optional[str] = None,
+    sent_after: Optional[str] = None,
+    sent_before: Optional[str] = None,
+    max_results: int = 10,
+    db_path: str = "./enron_emails.db",
+) -> List[SearchResult]:
+    """Like search_emails_local, but raises on errors (the tool server must not cache failures)"""
+    conn = get_db_connection(db_path)
+    cursor = conn.cursor()
+
+    sql, params = build_search_query(
+        inbox=inbox,
+        keywords=keywords,
+        from_addr=from_addr,
+        to_addr=to_addr,
+        sent_after=sent_after,
+        sent_before=sent_before,
+        max_results=max_results,
+    )
+
+    with timed("search_emails_sql"):
+        cursor.execute(sql, params)
+        results = cursor.fetchall()
+    record("search_emails_rows", len(results))
+
+    return [SearchResult(message_id=row[0], snippet=row[1]) for row in results]
+
+
 def read_email(
     message_id: str,
     db_path: str = "./enron_emails.db",
 ) -> Optional[Email]:
     """Retrieve a single email by its message_id"""
+    client = get_tool_server_client()
+    if client is not None:
+        ok, email = client.read_email(message_id=message_id, db_path=db_path)
+        if ok:
+            return email
+    return read_email_local(message_id, db_path=db_path)
+
+
+def read_email_local(
+    message_id: str,
+    db_path: str = "./enron_emails.db",
+) -> Optional[Email]:
+    """read_email against this process's own SQLite connection"""
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
+        return query_read_email(message_id, db_path=db_path)
+    except sqlite3.Error as e:
+        print(f"Database error in read_email: {e}")
+        return None
+    except Exception as e:
+        print(f"Error in read_email: {e}")
+        return None
+
 
+def query_read_email(
+    message_id: str,
+    db_path: str = "./enron_emails.db",
+) -> Optional[Email]:
+    """Like read_email_local, but raises on errors (the tool server must not cache failures)"""
+    conn = get_db_connection(db_path)
+    cursor = conn.cursor()
+
+    with timed("read_email_sql"):
         # Get email details
         cursor.execute(
             "SELECT message_id, date, subject, from_address, body, file_name FROM emails WHERE message_id = ?",
@@ -123,6 +242,7 @@ def read_email(
         email_row = cursor.fetchone()
 
         if not email_row:
+            record("read_email_misses")
             return None
 
         msg_id, date, subject, from_addr, body, file_name = email_row
@@ -134,33 +254,26 @@ def read_email(
         )
         recipient_rows = cursor.fetchall()
 
-        to_addresses = []
-        cc_addresses = []
-        bcc_addresses = []
-
-        for addr, type_val in recipient_rows:
-            if type_val.lower() == "to":
-                to_addresses.append(addr)
-            elif type_val.lower() == "cc":
-                cc_addresses.append(addr)
-            elif type_val.lower() == "bcc":
-                bcc_addresses.append(addr)
-
-        return Email(
-            message_id=msg_id,
-            date=date,
-            subject=subject,
-            from_address=from_addr,
-            to_addresses=to_addresses,
-            cc_addresses=cc_addresses,
-            bcc_addresses=bcc_addresses,
-            body=body,
-            file_name=file_name,
-        )
-        
-    except sqlite3.Error as e:
-        print(f"Database error in read_email: {e}")
-        return None
-    except Exception as e:
-        print(f"Error in read_email: {e}")
-        return None
\ No newline at end of file
+    to_addresses = []
+    cc_addresses = []
+    bcc_addresses = []
+
+    for addr, type_val in recipient_rows:
+        if type_val.lower() == "to":
+            to_addresses.append(addr)
+        elif type_val.lower() == "cc":
+            cc_addresses.append(addr)
+        elif type_val.lower() == "bcc":
+            bcc_addresses.append(addr)
+
+    return Email(
+        message_id=msg_id,
+        date=date,
+        subject=subject,
+        from_address=from_addr,
+        to_addresses=to_addresses,
+        cc_addresses=cc_addresses,
+        bcc_addresses=bcc_addresses,
+        body=body,
+        file_name=file_name,
+    )
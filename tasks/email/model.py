@@ -1,10 +1,9 @@
 
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 from typing import List, Literal, Optional
-from datasets import Dataset, Features, Sequence, Value, load_dataset
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 
-import art
+__all__ = ["Email", "Scenario", "SearchResult", "FinalAnswer", "ProjectTrajectory", "EmailScenario"]
 
 # Email and Scenario data models
 class Email(BaseModel):
@@ -40,9 +39,25 @@ class FinalAnswer(BaseModel):
     answer: str
     source_ids: list[str]
 
-class ProjectTrajectory(art.Trajectory):
-    final_answer: FinalAnswer | None = None
+
+def _define_project_trajectory():
+    # art은 import가 무거워서 ProjectTrajectory가 처음 필요할 때만 불러온다
+    import art
+
+    class ProjectTrajectory(art.Trajectory):
+        final_answer: FinalAnswer | None = None
+
+    ProjectTrajectory.__qualname__ = "ProjectTrajectory"  # pickle은 module.__getattr__로 찾는다
+    return ProjectTrajectory
+
+
+def __getattr__(name):
+    if name == "ProjectTrajectory":
+        globals()[name] = _define_project_trajectory()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
     
 class EmailScenario(BaseModel):
     step: int
-    scenario: Scenario
\ No newline at end of file
+    scenario: Scenario
@@ -1,25 +1,67 @@
-import weave
+import time
 import uuid
-import art
-from art.langgraph import init_chat_model
-
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.tools import tool
-from langgraph.prebuilt import create_react_agent
+from typing import TYPE_CHECKING
 from dataclasses import asdict
 from textwrap import dedent
 
-from tasks.email.model import *
-from tasks.email.functions import *
+from tasks.email.model import EmailScenario, FinalAnswer
+from tasks.email.functions import read_email, search_emails
 from utils.judgement_llm import judge_correctness
+from utils.metrics import maybe_profile, record, recording, timed
+
+if TYPE_CHECKING:
+    import art
+    from tasks.email.model import ProjectTrajectory
 
 MAX_TURNS = 20
 
-@weave.op
+# weave / langchain / langgraph / art는 import만 수 초가 걸리므로 첫 rollout 때 불러온다
+_traced_rollout = None
+
+
+def _build_traced_rollout():
+    import weave
+
+    @weave.op
+    async def rollout(model, task_scenario):
+        return await _instrumented_rollout(model, task_scenario)
+
+    return rollout
+
+
 async def rollout(
-    model: art.Model, 
+    model: "art.Model",
     task_scenario: EmailScenario,  # 타입 힌트 명확화
-) -> ProjectTrajectory:
+) -> "ProjectTrajectory":
+    global _traced_rollout
+    if _traced_rollout is None:
+        _traced_rollout = _build_traced_rollout()
+    return await _traced_rollout(model, task_scenario)
+
+
+async def _instrumented_rollout(
+    model: "art.Model",
+    task_scenario: EmailScenario,
+) -> "ProjectTrajectory":
+    # tool / SQL / judge 호출이 기록하는 카운터를 이 rollout의 traj.metrics로 모은다
+    with recording() as recorder, maybe_profile(f"rollout-{task_scenario.scenario.id}"):
+        start = time.perf_counter()
+        traj = await _rollout(model, task_scenario)
+        record("rollout_s", time.perf_counter() - start)
+        traj.metrics.update(recorder.as_metrics())
+    return traj
+
+
+async def _rollout(
+    model: "art.Model",
+    task_scenario: EmailScenario,
+) -> "ProjectTrajectory":
+    from art.langgraph import init_chat_model
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from langchain_core.tools import tool
+    from langgraph.prebuilt import create_react_agent
+    from tasks.email.model import ProjectTrajectory
+
     scenario = task_scenario.scenario
 
     traj = ProjectTrajectory(
@@ -51,12 +93,13 @@ async def rollout(
         """Search the inbox for emails matching the given keywords and return
         a list of dictionaries so the LLM can easily consume them."""
         try:
-            results = search_emails(
-                inbox=scenario.inbox_address,
-                keywords=keywords,
-                sent_before=scenario.query_date,
-            )
-            return [asdict(result) for result in results]
+            with timed("search_inbox_tool"):
+                results = search_emails(
+                    inbox=scenario.inbox_address,
+                    keywords=keywords,
+                    sent_before=scenario.query_date,
+                )
+                return [asdict(result) for result in results]
         except Exception as e:
             print(f"Error in search_inbox_tool: {e}")
             return []
@@ -65,10 +108,11 @@ async def rollout(
     def read_email_tool(message_id: str) -> dict | None:
         """Read a specific email by message ID."""
         try:
-            email = read_email(message_id)
-            if email:
-                return email.model_dump()
-            return None
+            with timed("read_email_tool"):
+                email = read_email(message_id)
+                if email:
+                    return email.model_dump()
+                return None
         except Exception as e:
             print(f"Error in read_email_tool: {e}")
             return None
@@ -95,15 +139,17 @@ async def rollout(
             "recursion_limit": MAX_TURNS,
         }
 
-        agent_response = await react_agent.ainvoke(
-            {
-                "messages": [
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content=scenario.question),
-                ]
-            },
-            config=config,
-        )
+        # agent_s에는 vLLM 생성 시간 + tool 실행 시간이 포함된다
+        with timed("agent"):
+            agent_response = await react_agent.ainvoke(
+                {
+                    "messages": [
+                        SystemMessage(content=system_prompt),
+                        HumanMessage(content=scenario.question),
+                    ]
+                },
+                config=config,
+            )
         
         # Extract messages from agent response for trajectory
         if "messages" in agent_response:
@@ -127,9 +173,10 @@ async def rollout(
             traj.final_answer = final_answer
             # Score the trajectory
             try:
-                correctness_judge_response = await judge_correctness(
-                    scenario, traj.final_answer.answer
-                )
+                with timed("judge"):
+                    correctness_judge_response = await judge_correctness(
+                        scenario, traj.final_answer.answer
+                    )
                 traj.metrics["correct"] = float(correctness_judge_response.accept)
             except Exception as e:
                 print(f"Error in correctness judging: {e}")
@@ -1,10 +1,59 @@
+import os
 import random
 
-from typing import List, Literal, Optional
-from datasets import Dataset, load_dataset
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Sequence
 
 from tasks.email.model import Scenario
 
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+SCENARIO_CACHE_DIR = "./data/scenarios"
+
+
+def _snapshot_path(repo_id: str, split: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, repo_id.replace("/", "__"), f"{split}.arrow")
+
+
+def build_scenario_snapshot(repo_id: str, split: str, path: str) -> None:
+    """Download the split once and store it as an Arrow IPC file (memory-mappable)"""
+    import pyarrow as pa
+    from datasets import load_dataset
+
+    print(f"Loading {split} scenarios from Hugging Face...")
+    table = load_dataset(repo_id, split=split).data.table
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+class LazyScenarios(Sequence):
+    """List-like view over an Arrow table that builds Scenario objects on first access"""
+
+    def __init__(self, table: "pa.Table", split: str):
+        self._table = table
+        self._split = split
+        self._cache: Dict[int, Scenario] = {}
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("scenario index out of range")
+        if index not in self._cache:
+            row = self._table.slice(index, 1).to_pylist()[0]
+            self._cache[index] = Scenario(**row, split=self._split)
+        return self._cache[index]
+
+
 def load_training_scenarios(
     split: Literal["train", "test"] = "train",
     limit: Optional[int] = None,
@@ -12,37 +61,38 @@ def load_training_scenarios(
     shuffle: bool = False,
     seed: Optional[int] = None,
     SCENARIO_DATASET_REPO_ID: Optional[str] = "corbt/enron_emails_sample_questions",
-) -> List[Scenario]:
-    """Load training scenarios from Hugging Face dataset"""
-    
-    print(f"Loading {split} scenarios from Hugging Face...")
-    dataset: Dataset = load_dataset(SCENARIO_DATASET_REPO_ID, split=split)
+    cache_dir: str = SCENARIO_CACHE_DIR,
+    refresh: bool = False,
+) -> LazyScenarios:
+    """Load scenarios from a local Arrow snapshot of the Hugging Face dataset.
 
-    if max_messages is not None:
-        dataset = dataset.filter(lambda x: len(x["message_ids"]) <= max_messages)
+    The first call (or refresh=True) downloads the split and writes the snapshot; later
+    calls memory-map it. Filtering, shuffling and limit are applied on the Arrow table, and
+    Scenario objects are only built for the rows that are accessed.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
 
-    if shuffle or (seed is not None):
-        if seed is not None:
-            dataset = dataset.shuffle(seed=seed)
-        else:
-            dataset = dataset.shuffle()
+    path = _snapshot_path(SCENARIO_DATASET_REPO_ID, split, cache_dir)
+    if refresh or not os.path.exists(path):
+        build_scenario_snapshot(SCENARIO_DATASET_REPO_ID, split, path)
 
-    # Convert each row to a Scenario object
-    scenarios = [Scenario(**row, split=split) for row in dataset]
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
 
     if max_messages is not None:
-        scenarios = [s for s in scenarios if len(s.message_ids) <= max_messages]
+        table = table.filter(pc.less_equal(pc.list_value_length(table["message_ids"]), max_messages))
 
-    if shuffle:
+    indices = list(range(table.num_rows))
+    if shuffle or (seed is not None):
         if seed is not None:
-            rng = random.Random(seed)
-            rng.shuffle(scenarios)
+            random.Random(seed).shuffle(indices)
         else:
-            random.shuffle(scenarios)
+            random.shuffle(indices)
 
     if limit is not None:
-        scenarios = scenarios[:limit]
+        indices = indices[:limit]
 
+    scenarios = LazyScenarios(table.take(indices), split)
     print(f"Loaded {len(scenarios)} scenarios.")
     return scenarios
 
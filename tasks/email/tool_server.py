@@ -0,0 +1,279 @@
+"""Local tool server: one warm email index shared by every training / eval process on a host.
+
+The server owns the SQLite connections and a shared LRU result cache, and answers
+`search_emails` / `read_email` requests over a Unix socket (newline-delimited JSON).
+Requests that arrive within a short window are batched: identical requests are answered
+once and each batch runs on one DB worker thread with a reused connection.
+
+    python -m tasks.email.tool_server --db ./enron_emails.db --socket /tmp/email_tools.sock
+    EMAIL_TOOL_SERVER=/tmp/email_tools.sock python 02.train.py
+
+With EMAIL_TOOL_SERVER set, tasks.email.functions routes calls through ToolServerClient
+and falls back to a local connection whenever the server is unreachable.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from tasks.email.functions import query_read_email, query_search_emails
+from tasks.email.model import Email, SearchResult
+from utils.metrics import record
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    batches: int = 0
+    deduplicated: int = 0
+    cache_hits: int = 0
+    db_calls: int = 0
+    errors: int = 0
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[Any]]:
+        """Returns (value,) on a hit so that a cached None (email not found) is still a hit"""
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key: str, value) -> None:
+        self._data[key] = (value,)
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+class ToolServer:
+    def __init__(
+        self,
+        db_path: str,
+        socket_path: str,
+        db_threads: int = 4,
+        batch_window_ms: float = 2.0,
+        max_batch_size: int = 64,
+        cache_entries: int = 50_000,
+    ):
+        self.db_path = os.path.abspath(db_path)
+        self.socket_path = socket_path
+        self.db_threads = db_threads
+        self.batch_window_s = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache = LRUCache(cache_entries)
+        self.stats = ServerStats()
+        # DB 스레드가 고정되어 있으므로 get_db_connection이 스레드마다 연결 하나를 계속 재사용한다
+        self.executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="email-db")
+        self.queue: "asyncio.Queue[Tuple[str, str, Dict, asyncio.Future]]" = None
+
+    def _execute(self, op: str, args: Dict) -> Any:
+        if op == "search_emails":
+            return [asdict(r) for r in query_search_emails(**args, db_path=self.db_path)]
+        if op == "read_email":
+            email = query_read_email(args["message_id"], db_path=self.db_path)
+            return email.model_dump() if email else None
+        raise ValueError(f"Unknown op: {op}")
+
+    def _execute_batch(self, requests: List[Tuple[str, str, Dict]]) -> Dict[str, Tuple[bool, Any]]:
+        # 실패(database is locked, I/O error 등)는 ok=False로 돌려주고 캐시하지 않는다. 클라이언트는 로컬로 fallback
+        results = {}
+        for key, op, args in requests:
+            try:
+                results[key] = (True, self._execute(op, args))
+            except Exception as e:
+                results[key] = (False, str(e))
+        return results
+
+    async def _batch_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window_s
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            waiters: Dict[str, List[asyncio.Future]] = {}
+            pending: List[Tuple[str, str, Dict]] = []
+            for key, op, args, future in batch:
+                if key in waiters:
+                    self.stats.deduplicated += 1
+                else:
+                    pending.append((key, op, args))
+                waiters.setdefault(key, []).append(future)
+
+            self.stats.batches += 1
+            self.stats.db_calls += len(pending)
+            results = await loop.run_in_executor(self.executor, self._execute_batch, pending)
+            for key, (ok, value) in results.items():
+                if ok:
+                    self.cache.put(key, value)
+                else:
+                    self.stats.errors += 1
+                for future in waiters[key]:
+                    if not future.done():
+                        future.set_result((ok, value))
+
+    async def _submit(self, op: str, args: Dict) -> Tuple[bool, Any, bool]:
+        self.stats.requests += 1
+        key = json.dumps([op, args], sort_keys=True)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats.cache_hits += 1
+            return True, cached[0], True
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, op, args, future))
+        ok, value = await future
+        return ok, value, False
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                args = dict(request.get("args", {}))
+                client_db = args.pop("db_path", None)
+                if request["op"] == "stats":
+                    response = {"ok": True, "result": asdict(self.stats)}
+                elif client_db and os.path.abspath(client_db) != self.db_path:
+                    response = {"ok": False, "error": f"server serves {self.db_path}, not {client_db}"}
+                else:
+                    ok, value, cached = await self._submit(request["op"], args)
+                    response = {"ok": ok, "result" if ok else "error": value, "cached": cached}
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    def _socket_in_use(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                return False
+        return True
+
+    async def serve(self, stats_interval_s: float = 60.0) -> None:
+        if os.path.exists(self.socket_path):
+            # 살아있는 서버의 socket을 지우지 않는다; 연결이 안 되는 socket만 이전 실행의 잔재로 보고 삭제
+            if self._socket_in_use():
+                raise RuntimeError(f"Another tool server is already listening on {self.socket_path}")
+            os.remove(self.socket_path)
+        self.queue = asyncio.Queue()
+        workers = [asyncio.create_task(self._batch_worker()) for _ in range(self.db_threads)]
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        print(f"Email tool server on {self.socket_path} serving {self.db_path} ({self.db_threads} DB threads)")
+        try:
+            async with server:
+                while True:
+                    await asyncio.sleep(stats_interval_s)
+                    print(f"[tool server] {asdict(self.stats)}")
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+class ToolServerClient:
+    """Blocking client (tools run in worker threads); one socket per thread"""
+
+    def __init__(self, socket_path: str, timeout_s: float = 30.0, retry_after_s: float = 10.0):
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+        self.retry_after_s = retry_after_s
+        self._local = threading.local()
+        self._unavailable_until = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_s)
+            sock.connect(self.socket_path)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+        return conn
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn:
+            conn[1].close()
+            conn[0].close()
+
+    def call(self, op: str, args: Dict) -> Tuple[bool, Any]:
+        """Returns (ok, result); ok is False when the caller should fall back to a local query"""
+        if time.monotonic() < self._unavailable_until:
+            return False, None
+        try:
+            sock, reader = self._connection()
+            sock.sendall((json.dumps({"op": op, "args": args}) + "\n").encode("utf-8"))
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("tool server closed the connection")
+            response = json.loads(line)
+        except (OSError, ValueError) as e:
+            self._close()
+            self._unavailable_until = time.monotonic() + self.retry_after_s
+            print(f"Tool server unavailable ({e}); using local database for {self.retry_after_s:.0f}s")
+            record("tool_server_fallbacks")
+            return False, None
+
+        record("tool_server_calls")
+        if response.get("cached"):
+            record("tool_server_cache_hits")
+        if not response["ok"]:
+            record("tool_server_fallbacks")
+            return False, None
+        return True, response["result"]
+
+    def search_emails(self, db_path: str, **args) -> Tuple[bool, Optional[List[SearchResult]]]:
+        ok, result = self.call("search_emails", {**args, "db_path": os.path.abspath(db_path)})
+        return ok, [SearchResult(**row) for row in result] if ok else None
+
+    def read_email(self, message_id: str, db_path: str) -> Tuple[bool, Optional[Email]]:
+        ok, result = self.call("read_email", {"message_id": message_id, "db_path": os.path.abspath(db_path)})
+        return ok, Email(**result) if ok and result else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared email tool server (Unix socket)")
+    parser.add_argument("--db", default="./enron_emails.db")
+    parser.add_argument("--socket", default="/tmp/email_tools.sock")
+    parser.add_argument("--db-threads", type=int, default=4)
+    parser.add_argument("--batch-window-ms", type=float, default=2.0)
+    parser.add_argument("--cache-entries", type=int, default=50_000)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise FileNotFoundError(f"Database file not found: {args.db}")
+    tool_server = ToolServer(
+        args.db, args.socket, db_threads=args.db_threads,
+        batch_window_ms=args.batch_window_ms, cache_entries=args.cache_entries,
+    )
+    try:
+        asyncio.run(tool_server.serve())
+    except RuntimeError as e:
+        print(e)
+        exit(1)
+    except KeyboardInterrupt:
+        print("\nTool server stopped")
@@ -0,0 +1,18 @@
+"""Import-time regression test: DB-only modules must not load the training stack.
+
+Runs each module of utils.import_budget.IMPORT_BUDGETS in a fresh interpreter. Only the
+deterministic part (which heavy dependencies get imported) is asserted here; wall-clock
+budgets are reported by `python -m utils.import_budget --check`.
+"""
+import pytest
+
+from utils.import_budget import IMPORT_BUDGETS, measure_import, unexpected_heavy
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS))
+def test_no_heavy_imports(module):
+    report = measure_import(module)
+    if report.error and report.error.startswith("ModuleNotFoundError"):
+        pytest.skip(f"dependency not installed: {report.error}")
+    assert report.error is None, report.error
+    assert unexpected_heavy(report) == [], f"{module} loads {unexpected_heavy(report)} at import time"
@@ -0,0 +1,83 @@
+"""RULER compaction on trajectories shaped like `art.langgraph.wrap_rollout` output.
+
+wrap_rollout converts the logged LangChain messages with convert_langgraph_messages:
+system/user dicts, a Choice for each generated turn (tool_calls in both LangChain and
+OpenAI shape) and tool messages that carry tool_call_id.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+art = pytest.importorskip("art")
+message_utils = pytest.importorskip("art.langgraph.message_utils")
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage  # noqa: E402
+
+import utils.ruler_compaction as ruler_compaction  # noqa: E402
+from utils.ruler_compaction import compact_group, ruler_score_group_compact  # noqa: E402
+
+INBOX = json.dumps([{"message_id": f"<{i}@enron.com>", "snippet": "Q3 forecast attached " * 10} for i in range(5)])
+
+
+def _rollout_trajectory(idx: int, answer: str) -> art.Trajectory:
+    logprobs = {"logprobs": None, "finish_reason": "tool_calls"}
+    messages = message_utils.convert_langgraph_messages([
+        SystemMessage(content="You are an email search agent.", id=f"sys-{idx}"),
+        HumanMessage(content="When is the Q3 forecast due?", id=f"human-{idx}"),
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "search_inbox_tool", "args": {"keywords": ["Q3"]}, "id": f"call_s{idx}"}],
+            response_metadata=logprobs,
+        ),
+        ToolMessage(content=INBOX, tool_call_id=f"call_s{idx}"),
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "return_final_answer_tool", "args": {"answer": answer}, "id": f"call_a{idx}"}],
+        ),
+        ToolMessage(content=answer, tool_call_id=f"call_a{idx}"),
+    ])
+    traj = art.Trajectory(messages_and_choices=[], reward=0.0, metrics={"correct": 0.0})
+    traj.messages_and_choices = messages  # wrap_rollout도 검증 없이 대입한다
+    return traj
+
+
+def _group() -> art.TrajectoryGroup:
+    return art.TrajectoryGroup(trajectories=[_rollout_trajectory(0, "Friday"), _rollout_trajectory(1, "Monday")])
+
+
+def test_compact_group_keeps_openai_message_shape():
+    compact_lists, stats = compact_group(_group())
+
+    assert stats.tool_outputs_deduplicated == 1  # second search result is the same inbox listing
+    for messages in compact_lists:
+        json.dumps(messages)  # RULER serializes the lists as-is
+        # 판정용 메시지도 OpenAI message param으로 검증돼야 한다 (tool_call_id 필수)
+        art.Trajectory(messages_and_choices=messages, reward=0.0)
+        tool_messages = [m for m in messages if m["role"] == "tool"]
+        assert all(m["tool_call_id"] for m in tool_messages)
+        calls = [c for m in messages for c in m.get("tool_calls", [])]
+        assert [c["function"]["name"] for c in calls] == ["search_inbox_tool", "return_final_answer_tool"]
+        assert all(c["id"] and c["type"] == "function" for c in calls)
+    # the shared system/user prefix is identical, so RULER sends it once
+    assert compact_lists[0][:2] == compact_lists[1][:2]
+
+
+def test_ruler_score_group_compact_writes_scores_back(monkeypatch):
+    seen = {}
+
+    async def fake_ruler(message_lists, judge_model, **kwargs):
+        seen["payload"] = json.dumps(message_lists)
+        return [SimpleNamespace(explanation="ok", score=0.5 * i) for i in range(1, len(message_lists) + 1)]
+
+    monkeypatch.setattr(ruler_compaction, "ruler", fake_ruler)
+    group = _group()
+    judged, stats = asyncio.run(ruler_score_group_compact(group, "judge"))
+
+    assert judged is group
+    assert [t.reward for t in group.trajectories] == [0.5, 1.0]
+    assert group.trajectories[0].metrics["independent_reward"] == 0.0
+    assert "identical to tool output #1" in seen["payload"]
+    assert stats.tokens_after < stats.tokens_before
+    # 원본 trajectory는 학습용이므로 전체 메시지를 그대로 유지한다
+    assert group.trajectories[1].messages()[3]["content"] == INBOX
@@ -26,22 +26,26 @@ CREATE TABLE recipients (
 );
 """
 
-SQL_CREATE_INDEXES_TRIGGERS = """
+# message_id는 UNIQUE 제약의 자동 인덱스가, recipient_address 단독 조회는 (recipient_address, email_id)
+# 복합 인덱스가 이미 처리하므로 별도 인덱스를 만들지 않는다. recipient_type으로 거르는 쿼리는 없다.
+# read_email의 recipients 조회는 (email_id, recipient_address, recipient_type) covering index로 처리.
+SQL_CREATE_INDEXES = """
 CREATE INDEX idx_emails_from ON emails(from_address);
 CREATE INDEX idx_emails_date ON emails(date);
-CREATE INDEX idx_emails_message_id ON emails(message_id);
-CREATE INDEX idx_recipients_address ON recipients(recipient_address);
-CREATE INDEX idx_recipients_type ON recipients(recipient_type);
-CREATE INDEX idx_recipients_email_id ON recipients(email_id);
+CREATE INDEX idx_recipients_email_id ON recipients(email_id, recipient_address, recipient_type);
 CREATE INDEX idx_recipients_address_email ON recipients(recipient_address, email_id);
+"""
 
+SQL_CREATE_FTS = """
 CREATE VIRTUAL TABLE emails_fts USING fts5(
     subject,
     body,
     content='emails',
     content_rowid='id'
 );
+"""
 
+SQL_CREATE_TRIGGERS = """
 CREATE TRIGGER emails_ai AFTER INSERT ON emails BEGIN
     INSERT INTO emails_fts (rowid, subject, body)
     VALUES (new.id, new.subject, new.body);
@@ -54,4 +58,7 @@ END;
 CREATE TRIGGER emails_au AFTER UPDATE ON emails BEGIN
     UPDATE emails_fts SET subject=new.subject, body=new.body WHERE rowid=old.id;
 END;
-"""
\ No newline at end of file
+"""
+
+# 인덱스 생성 단계는 utils/database_build.py 참고 (이 스크립트 뒤에 FTS rebuild가 필요)
+SQL_CREATE_INDEXES_TRIGGERS = SQL_CREATE_INDEXES + SQL_CREATE_FTS + SQL_CREATE_TRIGGERS
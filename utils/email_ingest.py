@@ -0,0 +1,301 @@
+"""Local ingestion sources (raw maildir, mbox, JSONL) for the email database.
+
+Sources yield lightweight work items (file paths, raw message bytes, JSON lines) that are
+parsed into EmailRecords in a process pool. The main process applies the same filters as
+01.get_db.py (body length, recipient count, (subject, body, from) dedup) and a single
+EmailWriter batch-inserts into the schema from utils/database_schema.py.
+"""
+import email
+import hashlib
+import json
+import mailbox
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.message import Message
+from email.utils import getaddresses, parsedate_to_datetime
+from multiprocessing import Pool
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@dataclass
+class EmailRecord:
+    message_id: str
+    subject: str
+    from_address: str
+    date: str  # DATE_FORMAT
+    body: str
+    file_name: str
+    to: List[str] = field(default_factory=list)
+    cc: List[str] = field(default_factory=list)
+    bcc: List[str] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Parsing (runs in worker processes, so everything here is module-level)
+# ---------------------------------------------------------------------------
+
+def _addresses(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [addr.strip().lower() for _, addr in getaddresses([value]) if addr.strip()]
+
+
+def _format_date(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    # HF 데이터셋과 같게 헤더의 현지 시각을 그대로 쓴다 (UTC로 바꾸지 않음)
+    parsed = parsed.replace(tzinfo=None)
+    return parsed.strftime(DATE_FORMAT)
+
+
+def _body_text(message: Message) -> str:
+    parts = message.walk() if message.is_multipart() else [message]
+    texts = []
+    for part in parts:
+        if part.get_content_type() != "text/plain" or part.get_filename():
+            continue
+        payload = part.get_payload(decode=True) or b""
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            texts.append(payload.decode(charset, errors="replace"))
+        except LookupError:
+            texts.append(payload.decode("latin-1"))
+    return "\n".join(texts).strip()
+
+
+def parse_rfc822(raw: bytes, file_name: str) -> Optional[EmailRecord]:
+    message = email.message_from_bytes(raw)
+    message_id = (message.get("Message-ID") or "").strip()
+    date = _format_date(message.get("Date"))
+    if not message_id or not date:
+        return None
+    from_addresses = _addresses(message.get("From"))
+    return EmailRecord(
+        message_id=message_id,
+        subject=str(message.get("Subject") or ""),
+        from_address=from_addresses[0] if from_addresses else "",
+        date=date,
+        body=_body_text(message),
+        file_name=file_name,
+        to=_addresses(message.get("To")),
+        cc=_addresses(message.get("Cc")),
+        bcc=_addresses(message.get("Bcc")),
+    )
+
+
+# parse_*_item은 pool worker에서 실행된다. 예외가 나면 pool.imap이 부모에서 다시 던져 ingestion 전체가
+# 멈추므로, 깨진 파일/줄 하나는 None(unparseable)으로 처리하고 넘어간다
+
+
+def parse_maildir_item(item: Tuple[str, str]) -> Optional[EmailRecord]:
+    path, file_name = item
+    try:
+        with open(path, "rb") as f:
+            return parse_rfc822(f.read(), file_name)
+    except Exception as e:
+        print(f"Skipping unparseable message {file_name}: {e!r}")
+        return None
+
+
+def parse_raw_item(item: Tuple[bytes, str]) -> Optional[EmailRecord]:
+    raw, file_name = item
+    try:
+        return parse_rfc822(raw, file_name)
+    except Exception as e:
+        print(f"Skipping unparseable message {file_name}: {e!r}")
+        return None
+
+
+def parse_jsonl_item(item: Tuple[str, str]) -> Optional[EmailRecord]:
+    line, file_name = item
+    try:
+        return _parse_jsonl_row(json.loads(line), file_name)
+    except Exception as e:
+        print(f"Skipping unparseable line {file_name}: {e!r}")
+        return None
+
+
+def _parse_jsonl_row(row: dict, file_name: str) -> Optional[EmailRecord]:
+    """One JSON object per line with the corbt/enron-emails fields"""
+    date = row.get("date")
+    if not row.get("message_id") or not date:
+        return None
+    date = datetime.fromisoformat(str(date)).replace(tzinfo=None).strftime(DATE_FORMAT)  # 잘못된 날짜는 ValueError
+    return EmailRecord(
+        message_id=row["message_id"],
+        subject=row.get("subject") or "",
+        from_address=row.get("from") or "",
+        date=date,
+        body=row.get("body") or "",
+        file_name=row.get("file_name") or file_name,
+        to=[str(a) for a in row.get("to") or [] if a],
+        cc=[str(a) for a in row.get("cc") or [] if a],
+        bcc=[str(a) for a in row.get("bcc") or [] if a],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+@dataclass
+class IngestSource:
+    name: str
+    items: Callable[[], Iterable]
+    parse: Callable[[object], Optional[EmailRecord]]
+
+
+def maildir_source(root: str) -> IngestSource:
+    """Raw maildir tree (e.g. the Enron maildir/<user>/<folder>/<n>. files)"""
+    def items() -> Iterator[Tuple[str, str]]:
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                yield path, os.path.relpath(path, root)
+    return IngestSource(name=f"maildir:{root}", items=items, parse=parse_maildir_item)
+
+
+def mbox_source(path: str) -> IngestSource:
+    def items() -> Iterator[Tuple[bytes, str]]:
+        box = mailbox.mbox(path, create=False)
+        try:
+            for key in box.iterkeys():
+                yield box.get_bytes(key), f"{os.path.basename(path)}:{key}"
+        finally:
+            box.close()
+    return IngestSource(name=f"mbox:{path}", items=items, parse=parse_raw_item)
+
+
+def jsonl_source(path: str) -> IngestSource:
+    def items() -> Iterator[Tuple[str, str]]:
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line, f"{os.path.basename(path)}:{line_no}"
+    return IngestSource(name=f"jsonl:{path}", items=items, parse=parse_jsonl_item)
+
+
+SOURCE_TYPES = {"maildir": maildir_source, "mbox": mbox_source, "jsonl": jsonl_source}
+
+
+# ---------------------------------------------------------------------------
+# Filtering and writing (main process)
+# ---------------------------------------------------------------------------
+
+class EmailFilter:
+    """Same filters as the original project: body length, recipient count, dedup"""
+
+    def __init__(self, max_body_chars: int = 5000, max_recipients: int = 30):
+        self.max_body_chars = max_body_chars
+        self.max_recipients = max_recipients
+        self._seen = set()  # (subject, body, from)의 digest만 저장해 큰 아카이브에서도 메모리를 아낀다
+        self._message_ids = set()  # 여러 소스에 같은 메일이 들어있는 경우
+        self.skipped_count = 0
+        self.duplicate_count = 0
+
+    def accept(self, record: EmailRecord) -> bool:
+        if len(record.body) > self.max_body_chars:
+            self.skipped_count += 1
+            return False
+        if len(record.to) + len(record.cc) + len(record.bcc) > self.max_recipients:
+            self.skipped_count += 1
+            return False
+        # HF 컬럼은 nullable이므로 None도 그대로 key에 들어갈 수 있게 tuple을 직렬화한다
+        key = hashlib.sha1(json.dumps((record.subject, record.body, record.from_address)).encode("utf-8")).digest()
+        if key in self._seen or record.message_id in self._message_ids:
+            self.duplicate_count += 1
+            return False
+        self._seen.add(key)
+        self._message_ids.add(record.message_id)
+        return True
+
+
+class EmailWriter:
+    """Single writer that batch-inserts emails and recipients"""
+
+    def __init__(self, conn, batch_size: int = 5000):
+        self.conn = conn
+        self.batch_size = batch_size
+        self._emails: List[tuple] = []
+        self._recipients: List[tuple] = []
+        self.record_count = 0
+        self.insert_seconds = 0.0
+
+    def add(self, record: EmailRecord) -> None:
+        self._emails.append(
+            (record.message_id, record.subject, record.from_address, record.date, record.body, record.file_name)
+        )
+        for kind, addresses in (("to", record.to), ("cc", record.cc), ("bcc", record.bcc)):
+            self._recipients.extend((record.message_id, addr, kind) for addr in addresses)
+        if len(self._emails) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._emails:
+            return
+        start = time.perf_counter()
+        # message_id 중복은 EmailFilter가 거르므로 모든 row가 실제로 들어가고 recipients도 그대로 붙는다
+        self.conn.executemany(
+            "INSERT INTO emails (message_id, subject, from_address, date, body, file_name) VALUES (?, ?, ?, ?, ?, ?)",
+            self._emails,
+        )
+        self.conn.executemany(
+            "INSERT INTO recipients (email_id, recipient_address, recipient_type) VALUES (?, ?, ?)",
+            self._recipients,
+        )
+        self.record_count += len(self._emails)
+        self.insert_seconds += time.perf_counter() - start
+        self._emails, self._recipients = [], []
+
+
+@dataclass
+class IngestReport:
+    parsed: int = 0
+    unparseable: int = 0
+    wall_seconds: float = 0.0
+    insert_seconds: float = 0.0
+
+    def print(self, writer: EmailWriter, email_filter: EmailFilter) -> None:
+        parse_rate = self.parsed / self.wall_seconds if self.wall_seconds else 0.0
+        insert_rate = writer.record_count / self.insert_seconds if self.insert_seconds else 0.0
+        print(f"Parsed {self.parsed} messages in {self.wall_seconds:.1f}s ({parse_rate:.0f} msg/s), "
+              f"{self.unparseable} unparseable")
+        print(f"Inserted {writer.record_count} emails in {self.insert_seconds:.1f}s of writer time ({insert_rate:.0f} rows/s)")
+        print(f"Skipped {email_filter.skipped_count} emails due to length/recipient limits.")
+        print(f"Skipped {email_filter.duplicate_count} duplicate emails.")
+
+
+def ingest_sources(
+    sources: List[IngestSource],
+    writer: EmailWriter,
+    email_filter: EmailFilter,
+    workers: Optional[int] = None,
+    chunksize: int = 256,
+) -> IngestReport:
+    """Parse every source in a process pool and feed the single writer"""
+    from tqdm import tqdm
+
+    report = IngestReport()
+    start = time.perf_counter()
+    with Pool(processes=workers or os.cpu_count()) as pool:
+        for source in sources:
+            print(f"Ingesting {source.name}...")
+            for record in tqdm(pool.imap(source.parse, source.items(), chunksize=chunksize), desc=source.name):
+                if record is None:
+                    report.unparseable += 1
+                    continue
+                report.parsed += 1
+                if email_filter.accept(record):
+                    writer.add(record)
+    writer.flush()
+    report.wall_seconds = time.perf_counter() - start
+    report.insert_seconds = writer.insert_seconds
+    return report
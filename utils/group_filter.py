@@ -0,0 +1,64 @@
+"""Drop trajectory groups that carry no relative signal before RULER and training.
+
+A group where every rollout ends the same way (all correct, all wrong, all errored)
+gives GRPO no advantage to learn from, so judging and training on it is wasted work.
+The outcome is read from signals rollout() already produces: traj.metrics["error"],
+traj.metrics["correct"] and whether a final answer was returned.
+"""
+import random
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import art
+
+
+def trajectory_outcome(traj: "art.Trajectory") -> Tuple:
+    """Cheap outcome key of a finished rollout"""
+    if traj.metrics.get("error"):
+        return ("error",)
+    if getattr(traj, "final_answer", None) is None:
+        return ("no_answer",)
+    return ("answer", float(traj.metrics.get("correct", 0.0)))
+
+
+def is_zero_signal(group: "art.TrajectoryGroup") -> bool:
+    return len({trajectory_outcome(traj) for traj in group.trajectories}) <= 1
+
+
+@dataclass
+class GroupFilterStats:
+    groups_in: int = 0
+    groups_dropped: int = 0
+    zero_signal_kept: int = 0  # down-sampling으로 남긴 zero-signal group
+    judge_calls_saved: int = 0
+    trajectories_saved: int = 0
+
+    def as_metrics(self) -> Dict[str, float]:
+        return asdict(self)
+
+    def merge(self, other: "GroupFilterStats") -> None:
+        for key, value in asdict(other).items():
+            setattr(self, key, getattr(self, key) + value)
+
+
+def filter_zero_signal_groups(
+    groups: List["art.TrajectoryGroup"],
+    keep_prob: float = 0.0,
+    rng: Optional[random.Random] = None,
+) -> Tuple[List["art.TrajectoryGroup"], GroupFilterStats]:
+    """Return the groups worth judging; zero-signal groups survive with probability keep_prob"""
+    rng = rng or random
+    stats = GroupFilterStats(groups_in=len(groups))
+    kept = []
+    for group in groups:
+        if not is_zero_signal(group):
+            kept.append(group)
+        elif keep_prob > 0 and rng.random() < keep_prob:
+            stats.zero_signal_kept += 1
+            kept.append(group)
+        else:
+            stats.groups_dropped += 1
+            stats.judge_calls_saved += 1  # RULER은 group당 한 번 호출
+            stats.trajectories_saved += len(group.trajectories)
+    return kept, stats
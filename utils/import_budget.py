@@ -0,0 +1,141 @@
+"""Import-time report and startup budget for the task / utils modules.
+
+Each module is imported in a fresh interpreter with `-X importtime`. The check fails when
+a module pulls in a heavy dependency it should only load on first use (art, weave,
+langchain, langgraph, litellm, datasets) or exceeds its cumulative import-time budget.
+
+Budgets are relative: they are multiples of the import time of a reference stdlib module
+(asyncio) measured the same way on the same host, so a slow or loaded machine scales them
+instead of failing. The heavy-dependency part is deterministic and is what
+tests/test_import_budget.py asserts.
+
+    python -m utils.import_budget            # report
+    python -m utils.import_budget --check    # exit 1 on a budget violation
+"""
+import argparse
+import json
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+HEAVY_MODULES = ["art", "weave", "langchain_core", "langgraph", "litellm", "datasets", "torch", "vllm"]
+
+REFERENCE_MODULE = "asyncio"  # ~0.05s on a typical dev machine
+
+# module -> (cumulative import budget in units of the reference import, heavy modules it may load at import time)
+IMPORT_BUDGETS: Dict[str, tuple] = {
+    "utils.metrics": (1.5, []),
+    "utils.database_schema": (1.5, []),
+    "utils.database_build": (1.5, []),
+    "utils.email_ingest": (3, []),
+    "utils.group_filter": (1.5, []),
+    "utils.scenario_sampler": (1.5, []),
+    "utils.run_state": (1.5, []),
+    "utils.judgement_llm": (10, []),
+    "tasks.email.model": (8, []),
+    "tasks.email.functions": (8, []),
+    "tasks.email.scenarios": (8, []),
+    "tasks.email.bench": (10, []),
+    "tasks.email.tool_server": (10, []),
+    "tasks.email.rollout": (12, []),
+}
+
+
+@dataclass
+class ImportReport:
+    module: str
+    seconds: float = 0.0
+    heavy_loaded: List[str] = field(default_factory=list)
+    slowest: List[tuple] = field(default_factory=list)  # (seconds, module) of the slowest nested imports
+    error: Optional[str] = None
+
+
+def measure_import(module: str, top: int = 5) -> ImportReport:
+    code = f"import sys, json; import {module}; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True,
+    )
+    report = ImportReport(module=module)
+    timings, other_lines = [], []
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            other_lines.append(line)
+        elif "[us]" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            timings.append((int(cumulative) / 1e6, name.rstrip()))
+    if proc.returncode != 0:
+        report.error = other_lines[-1] if other_lines else f"exit code {proc.returncode}"
+        return report
+
+    loaded = set(json.loads(proc.stdout.strip().splitlines()[-1]))
+    report.heavy_loaded = [m for m in HEAVY_MODULES if m in loaded]
+    # -X importtime은 자식 import를 부모보다 먼저, 두 칸 더 들여써서 출력한다
+    indent = lambda name: len(name) - len(name.lstrip())
+    for index, (seconds, name) in enumerate(timings):
+        if name.strip() != module:
+            continue
+        report.seconds = seconds
+        direct = []
+        for child_seconds, child in reversed(timings[:index]):
+            if indent(child) <= indent(name):
+                break
+            if indent(child) == indent(name) + 2:
+                direct.append((child_seconds, child.strip()))
+        report.slowest = sorted(direct, reverse=True)[:top]
+    return report
+
+
+def reference_seconds(samples: int = 3) -> float:
+    """Fastest of a few imports of REFERENCE_MODULE (the minimum is the least noisy)"""
+    return min(measure_import(REFERENCE_MODULE).seconds for _ in range(samples))
+
+
+def unexpected_heavy(report: ImportReport) -> List[str]:
+    allowed_heavy = IMPORT_BUDGETS[report.module][1]
+    return [m for m in report.heavy_loaded if m not in allowed_heavy]
+
+
+def check_budgets(reports: List[ImportReport], reference_s: float) -> List[str]:
+    violations = []
+    for report in reports:
+        budget = IMPORT_BUDGETS[report.module][0] * reference_s
+        if report.error:
+            violations.append(f"{report.module}: import failed ({report.error})")
+            continue
+        if report.seconds > budget:
+            violations.append(f"{report.module}: {report.seconds:.3f}s > budget {budget:.3f}s")
+        unexpected = unexpected_heavy(report)
+        if unexpected:
+            violations.append(f"{report.module}: loads {', '.join(unexpected)} at import time")
+    return violations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time report and startup budget check")
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS))
+    parser.add_argument("--check", action="store_true", help="exit 1 if a budget is exceeded")
+    args = parser.parse_args()
+
+    reference_s = reference_seconds()
+    reports = [measure_import(module) for module in args.modules if module in IMPORT_BUDGETS]
+    print(f"reference: import {REFERENCE_MODULE} {reference_s:.3f}s (budgets are multiples of this)\n")
+    print(f"{'module':<28}{'import s':>10}{'budget s':>10}  heavy deps loaded / slowest direct imports")
+    for report in reports:
+        budget = IMPORT_BUDGETS[report.module][0] * reference_s
+        if report.error:
+            print(f"{report.module:<28}{'error':>10}{budget:>10.3f}  {report.error}")
+            continue
+        slowest = ", ".join(f"{name} {seconds:.3f}s" for seconds, name in report.slowest[:3])
+        print(f"{report.module:<28}{report.seconds:>10.3f}{budget:>10.3f}  {report.heavy_loaded or '-'} / {slowest}")
+
+    if args.check:
+        violations = check_budgets(reports, reference_s)
+        if violations:
+            print("\nStartup budget violations:")
+            for violation in violations:
+                print(f"  {violation}")
+            exit(1)
+        print("\nAll modules within their startup budget.")
@@ -1,22 +1,88 @@
 
 
 
-from litellm import acompletion
+import hashlib
+import os
+import sqlite3
+from typing import Optional
+
 from textwrap import dedent
 from pydantic import BaseModel, Field
 from tenacity import retry, stop_after_attempt
 
+from utils.metrics import record
+
 
 class CorrectnessJudgeResponse(BaseModel):
     reasoning: str = Field(description="Explanation of the reasoning process.")
     accept: bool = Field(description="Whether the AI answer should be accepted.")
 
 
-@retry(stop=stop_after_attempt(3))
+class JudgeCache:
+    """Persistent verdict cache keyed on (question, reference answer, normalized AI answer)"""
+
+    def __init__(self, path: str = "./judge_cache.db"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS judge_verdicts (key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def key(scenario, answer: str) -> str:
+        normalized = " ".join(answer.split()).lower()
+        payload = "\x1f".join([scenario.question, scenario.answer, normalized])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, scenario, answer: str) -> Optional[CorrectnessJudgeResponse]:
+        row = self.conn.execute(
+            "SELECT response FROM judge_verdicts WHERE key = ?", (self.key(scenario, answer),)
+        ).fetchone()
+        return CorrectnessJudgeResponse.model_validate_json(row[0]) if row else None
+
+    def put(self, scenario, answer: str, response: CorrectnessJudgeResponse) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO judge_verdicts (key, response) VALUES (?, ?)",
+            (self.key(scenario, answer), response.model_dump_json()),
+        )
+        self.conn.commit()
+
+
+_judge_cache: Optional[JudgeCache] = None
+
+
+def set_judge_cache(path: Optional[str]) -> None:
+    """Enable (or with None disable) verdict reuse for judge_correctness in this process"""
+    global _judge_cache
+    _judge_cache = JudgeCache(path) if path else None
+
+
 async def judge_correctness(
     scenario,
     answer: str
 ) -> CorrectnessJudgeResponse:
+    if _judge_cache is not None:
+        cached = _judge_cache.get(scenario, answer)
+        if cached is not None:
+            record("judge_cache_hits")
+            return cached
+
+    response = await _judge_correctness(scenario, answer)
+    # parse error 결과는 캐시하지 않는다
+    if _judge_cache is not None and not response.reasoning.startswith("Parse error:"):
+        _judge_cache.put(scenario, answer, response)
+    return response
+
+
+@retry(stop=stop_after_attempt(3))
+async def _judge_correctness(
+    scenario,
+    answer: str
+) -> CorrectnessJudgeResponse:
+    from litellm import acompletion  # litellm import는 무거워서 실제 호출 때 불러온다
+
+    record("judge_attempts")  # retry 포함 호출 횟수 (attempts - calls = retries)
     system_prompt = dedent(
         """
         You are given a question, the reference answer (labelled **Reference answer**), and an answer generated by an AI assistant (labelled **AI answer**).
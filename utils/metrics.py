@@ -0,0 +1,157 @@
+"""Lightweight timing/counter instrumentation for tools, judges and training steps.
+
+Rollouts open a `recording()` scope; anything called inside it (tools, SQLite helpers,
+the correctness judge) adds counters with `record()` / `timed()` and the totals end up in
+`traj.metrics`. The training loop uses `StepMetrics` for per-step phase durations.
+
+Cache metrics (hit = a lookup answered without touching SQLite or the judge LLM):
+
+- `tool_server_cache_hits` / `tool_server_calls`: search_emails / read_email results served
+  from the shared tool server's LRU cache (tasks.email.tool_server, EMAIL_TOOL_SERVER set)
+- `judge_cache_hits`: correctness verdicts reused from the judge cache
+
+Per-thread SQLite connections are reused by construction, so only `db_connections_opened`
+is recorded for them; it is not a cache metric.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+
+class MetricsRecorder:
+    """Thread-safe accumulator of named float counters"""
+
+    def __init__(self):
+        self._values: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._values[name] += value
+
+    def as_metrics(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+# LangChain은 sync tool을 copy_context()로 스레드에서 실행하므로 rollout의 recorder가 그대로 보인다
+_current_recorder: ContextVar[Optional[MetricsRecorder]] = ContextVar("metrics_recorder", default=None)
+
+
+@contextmanager
+def recording() -> Iterator[MetricsRecorder]:
+    """Bind a fresh recorder to the current context (one per rollout)"""
+    recorder = MetricsRecorder()
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+def record(name: str, value: float = 1.0) -> None:
+    """Add to a counter of the active recorder; no-op outside a recording() scope"""
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.add(name, value)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Record `{name}_calls` and total `{name}_s` for the wrapped block"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(f"{name}_calls")
+        record(f"{name}_s", time.perf_counter() - start)
+
+
+@contextmanager
+def maybe_profile(label: str) -> Iterator[None]:
+    """Optional sampling profiler hook (pyinstrument).
+
+    Enabled with ART_PROFILE_ROLLOUTS=<sample rate 0..1>; HTML reports are written to
+    ART_PROFILE_DIR (default ./profiles).
+    """
+    rate = float(os.getenv("ART_PROFILE_ROLLOUTS", "0") or 0)
+    if rate <= 0 or random.random() >= rate:
+        yield
+        return
+
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        print("ART_PROFILE_ROLLOUTS is set but pyinstrument is not installed; skipping profiling")
+        yield
+        return
+
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        out_dir = os.getenv("ART_PROFILE_DIR", "./profiles")
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"{label}-{int(time.time() * 1000)}.html")
+        with open(path, "w") as f:
+            f.write(profiler.output_html())
+
+
+class StepMetrics:
+    """Per-training-step phase durations and aggregated trajectory metrics"""
+
+    def __init__(self, step: int):
+        self.step = step
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.phase_calls: Dict[str, int] = defaultdict(int)
+        self.values: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+            self.phase_calls[name] += 1
+
+    def add_trajectory_metrics(self, groups: Iterable) -> None:
+        """Average every numeric traj.metrics key over all trajectories of the step"""
+        totals: Dict[str, float] = defaultdict(float)
+        count = 0
+        for group in groups:
+            for traj in group.trajectories:
+                count += 1
+                for key, value in traj.metrics.items():
+                    if isinstance(value, (int, float)):
+                        totals[key] += float(value)
+        self.values["trajectories"] = count
+        for key, total in totals.items():
+            self.values[f"mean_{key}"] = total / count
+
+    def summary(self) -> Dict[str, float]:
+        out: Dict[str, float] = {"step": self.step}
+        for name, seconds in self.phases.items():
+            out[f"{name}_s"] = round(seconds, 4)
+            if self.phase_calls[name] > 1:
+                out[f"{name}_per_call_s"] = round(seconds / self.phase_calls[name], 4)
+        out.update({k: round(v, 4) if isinstance(v, float) else v for k, v in self.values.items()})
+        return out
+
+    def log(self, path: Optional[str] = "./logs/step_metrics.jsonl", keys: Sequence[str] = ("gather_s", "ruler_s", "train_s")) -> None:
+        """Print a one-line summary and append the full summary as JSON to `path`"""
+        summary = self.summary()
+        brief = ", ".join(f"{k}={summary[k]}" for k in keys if k in summary)
+        print(f"[step {self.step}] {brief}")
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(summary) + "\n")
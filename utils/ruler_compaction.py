@@ -0,0 +1,152 @@
+"""Shrink RULER judge payloads before `ruler_score_group`.
+
+RULER sends every trajectory of a group in one prompt and already factors out a common
+message prefix, but only when the prefix messages are byte-identical. LangChain message
+dicts carry per-message ids and metadata, so in practice the system prompt and question
+are repeated for every rollout. Compaction:
+
+- normalizes messages to plain OpenAI message dicts (role, content, tool_calls with
+  id/type/function, tool_call_id) so the shared prefix is identical and gets sent once,
+- replaces tool outputs already shown earlier in the group (typically the same
+  read_email_tool body) with a short reference to the first occurrence,
+- caps very long tool outputs.
+
+The compacted message lists are scored with `art.rewards.ruler` directly and the scores
+are written back to the original trajectories, which keep their full messages for training.
+"""
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import art
+from art.rewards import ruler
+
+LANGCHAIN_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+
+@dataclass
+class CompactionStats:
+    tokens_before: int = 0
+    tokens_after: int = 0
+    tool_outputs_deduplicated: int = 0
+    tool_outputs_truncated: int = 0
+
+    @property
+    def reduction(self) -> float:
+        return 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0
+
+    def merge(self, other: "CompactionStats") -> None:
+        for key, value in asdict(other).items():
+            setattr(self, key, getattr(self, key) + value)
+
+    def as_metrics(self) -> Dict[str, float]:
+        return {f"ruler_{k}": v for k, v in asdict(self).items()} | {"ruler_token_reduction": self.reduction}
+
+
+def estimate_ruler_tokens(message_lists: List[List[dict]]) -> int:
+    """Approximate judge input tokens (~4 chars/token), counting the common prefix once like RULER"""
+    prefix_len = 0
+    for idx, msg in enumerate(message_lists[0] if message_lists else []):
+        if all(len(messages) > idx and messages[idx] == msg for messages in message_lists):
+            prefix_len += 1
+        else:
+            break
+    chars = len(json.dumps(message_lists[0][:prefix_len], default=str)) if prefix_len else 0
+    chars += sum(len(json.dumps(messages[prefix_len:], default=str)) for messages in message_lists)
+    return chars // 4
+
+
+def _normalize_tool_calls(tool_calls) -> Optional[List[dict]]:
+    calls = []
+    for call in tool_calls or []:
+        if "function" in call:  # OpenAI format (wrap_rollout이 LangChain 필드를 같이 남기기도 한다)
+            name, arguments = call["function"].get("name"), call["function"].get("arguments")
+        else:  # LangChain format
+            name, arguments = call.get("name"), json.dumps(call.get("args", {}), default=str)
+        calls.append({
+            "id": call.get("id") or "",
+            "type": "function",
+            "function": {"name": name or "", "arguments": arguments or "{}"},
+        })
+    return calls or None
+
+
+def normalize_message(message: dict) -> dict:
+    role = message.get("role") or LANGCHAIN_ROLES.get(message.get("type"), message.get("type", "unknown"))
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    normalized = {"role": role, "content": content}
+    tool_calls = _normalize_tool_calls(message.get("tool_calls"))
+    if tool_calls:
+        normalized["tool_calls"] = tool_calls
+    if role == "tool":
+        # ChatCompletionToolMessageParam은 tool_call_id가 필수라 빠지면 art.Trajectory 검증이 실패한다
+        normalized["tool_call_id"] = message.get("tool_call_id") or ""
+    return normalized
+
+
+def compact_group(
+    group: art.TrajectoryGroup,
+    max_tool_chars: int = 2000,
+) -> Tuple[List[List[dict]], CompactionStats]:
+    """Return judge-only compacted message lists, one per trajectory of the group"""
+    stats = CompactionStats()
+    raw_lists = [traj.messages() for traj in group.trajectories]
+    seen_outputs: Dict[str, str] = {}  # content hash -> reference label
+
+    compact_lists = []
+    for messages in raw_lists:
+        compacted = []
+        for message in messages:
+            normalized = normalize_message(message)
+            if normalized["role"] == "tool" and normalized["content"]:
+                content = normalized["content"]
+                digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+                if digest in seen_outputs:
+                    normalized["content"] = f"[identical to tool output {seen_outputs[digest]} shown earlier]"
+                    stats.tool_outputs_deduplicated += 1
+                else:
+                    label = f"#{len(seen_outputs) + 1}"
+                    seen_outputs[digest] = label
+                    if len(content) > max_tool_chars:
+                        content = f"{content[:max_tool_chars]} ... [truncated {len(content) - max_tool_chars} chars]"
+                        stats.tool_outputs_truncated += 1
+                    normalized["content"] = f"[tool output {label}] {content}"
+            compacted.append(normalized)
+        compact_lists.append(compacted)
+
+    stats.tokens_before = estimate_ruler_tokens([[dict(m) for m in messages] for messages in raw_lists])
+    stats.tokens_after = estimate_ruler_tokens(compact_lists)
+    return compact_lists, stats
+
+
+async def ruler_score_group_compact(
+    group: art.TrajectoryGroup,
+    judge_model: str,
+    max_tool_chars: int = 2000,
+    swallow_exceptions: bool = False,
+    **ruler_kwargs,
+) -> Tuple[Optional[art.TrajectoryGroup], CompactionStats]:
+    """Same scoring as ruler_score_group, but the judge sees the compacted message lists.
+
+    The lists go straight to `ruler` instead of being re-validated as art.Trajectory
+    (pydantic turns tool_calls into one-shot iterators that json.dumps cannot encode).
+    Rewards and metrics are written onto the original trajectories, as ruler_score_group does.
+    """
+    compact_lists, stats = compact_group(group, max_tool_chars=max_tool_chars)
+    try:
+        scores = await ruler(compact_lists, judge_model, **ruler_kwargs)
+    except Exception as e:
+        if swallow_exceptions:
+            print(f"[art_ruler] Swallowed exception: {e}")
+            return None, stats
+        raise
+
+    for traj, score in zip(group.trajectories, scores):
+        traj.metrics["independent_reward"] = traj.reward
+        traj.metrics["ruler_score"] = score.score
+        traj.reward = score.score
+        traj.log(f"RULER explanation: {score.explanation}")
+    return group, stats
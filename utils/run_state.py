@@ -0,0 +1,87 @@
+"""Persistent run directory helpers: resumable loop state and checkpoint retention.
+
+LocalBackend already stores checkpoints under the run directory and `model.get_step()`
+resumes from the latest one; this module stores what ART does not know about (sampler
+position, RNG state) in `run_state.json` next to them.
+"""
+import fcntl
+import json
+import os
+import random
+import shutil
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+RUN_STATE_FILE = "run_state.json"
+RUN_LOCK_FILE = ".run.lock"
+
+
+@contextmanager
+def hold_run_lock(run_dir: str, owner: str = "training"):
+    """Exclusive lock on run_dir while a process owns its LocalBackend; yields run_dir.
+
+    Raises RuntimeError if another process (a training run or an eval) already holds it.
+    The lock is released automatically when the process dies.
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, RUN_LOCK_FILE), "a+") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.seek(0)
+            holder = lock_file.read().strip() or "another process"
+            raise RuntimeError(f"{run_dir} is in use by {holder}") from None
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{owner} (pid {os.getpid()})")
+        lock_file.flush()
+        try:
+            yield run_dir
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_run_state(run_dir: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(run_dir, RUN_STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_run_state(run_dir: str, state: Dict[str, Any]) -> None:
+    """Write run_state.json atomically so a crash never leaves a half-written file"""
+    path = os.path.join(run_dir, RUN_STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def get_rng_state() -> List:
+    version, internal, gauss = random.getstate()
+    return [version, list(internal), gauss]
+
+
+def set_rng_state(state: List) -> None:
+    version, internal, gauss = state
+    random.setstate((version, tuple(internal), gauss))
+
+
+def checkpoint_dir(backend_path: str, model) -> str:
+    # LocalBackend layout: {path}/{project}/models/{name}/checkpoints/{step:04d}
+    return os.path.join(backend_path, model.project, "models", model.name, "checkpoints")
+
+
+def prune_checkpoints(backend_path: str, model, keep_last: int = 2) -> List[str]:
+    """Delete all but the newest `keep_last` step checkpoints; returns the removed paths"""
+    path = checkpoint_dir(backend_path, model)
+    if not os.path.isdir(path):
+        return []
+    steps = sorted((name for name in os.listdir(path) if name.isdigit()), key=int)
+    removed = []
+    for name in steps[:-keep_last] if keep_last > 0 else steps:
+        full_path = os.path.join(path, name)
+        shutil.rmtree(full_path, ignore_errors=True)
+        removed.append(full_path)
+    return removed
@@ -0,0 +1,229 @@
+"""Adaptive scenario sampling driven by persisted per-scenario success statistics.
+
+Outcomes (rollouts attempted / judged correct) are stored per `Scenario.id` in a small
+SQLite file inside the run directory, so they survive restarts of the same run but never
+leak into another model's run. Counts are exponentially decayed on every visit, so the
+rate reflects the current policy rather than the whole history: a scenario that failed
+early in training becomes eligible again as soon as a revisit succeeds.
+
+Each epoch the sampler walks the scenario pool like art.utils.iterate_dataset, but skips
+scenarios the model recently always or never solves (after `min_attempts`, by default one
+full visit of `rollouts_per_group`) and prefers scenarios whose success rate is close to
+50%, where a group of rollouts gives the most relative signal. Every scenario is visited
+at most once per epoch, so the first epoch is never filtered: runs need more than one
+epoch (max_steps > len(scenarios) / groups_per_step) for the sampler to have any effect.
+If every scenario of an epoch is saturated, the epoch revisits all of them instead of
+ending the run.
+"""
+import math
+import random
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+SQL_CREATE_SCENARIO_STATS = """
+CREATE TABLE IF NOT EXISTS scenario_stats (
+    scenario_id INTEGER PRIMARY KEY,
+    attempts REAL NOT NULL DEFAULT 0,
+    successes REAL NOT NULL DEFAULT 0,
+    last_step INTEGER,
+    updated_at TEXT
+);
+"""
+
+
+class ScenarioStatsStore:
+    """Per-scenario rollout outcome counters in a local SQLite file.
+
+    Before adding a visit's outcomes the stored counts are multiplied by `decay`, so with
+    the default 0.7 and 4 rollouts per group roughly the last three visits dominate.
+    """
+
+    def __init__(self, path: str, decay: float = 0.7):
+        self.path = path
+        self.decay = decay
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SQL_CREATE_SCENARIO_STATS)
+        self.conn.commit()
+
+    def get(self, scenario_ids: Sequence[int]) -> Dict[int, Tuple[float, float]]:
+        """Return {scenario_id: (decayed attempts, decayed successes)} for the ids that have stats"""
+        out: Dict[int, Tuple[float, float]] = {}
+        ids = list(scenario_ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT scenario_id, attempts, successes FROM scenario_stats WHERE scenario_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            out.update({row[0]: (row[1], row[2]) for row in rows})
+        return out
+
+    def record(self, scenario_id: int, attempts: int, successes: float, step: Optional[int] = None) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO scenario_stats (scenario_id, attempts, successes, last_step, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(scenario_id) DO UPDATE SET
+                attempts = attempts * ? + excluded.attempts,
+                successes = successes * ? + excluded.successes,
+                last_step = excluded.last_step,
+                updated_at = excluded.updated_at
+            """,
+            (scenario_id, attempts, successes, step, datetime.now().isoformat(timespec="seconds"), self.decay, self.decay),
+        )
+
+    def record_groups(self, groups: Sequence, step: Optional[int] = None) -> None:
+        """Record the outcomes of finished trajectory groups (scenario id from traj.metadata)"""
+        for group in groups:
+            per_scenario: Dict[int, List[float]] = {}
+            for traj in group.trajectories:
+                scenario_id = traj.metadata.get("scenario_id")
+                if scenario_id is None:
+                    continue
+                per_scenario.setdefault(scenario_id, []).append(float(traj.metrics.get("correct", 0.0)))
+            for scenario_id, outcomes in per_scenario.items():
+                self.record(scenario_id, len(outcomes), sum(outcomes), step)
+        self.conn.commit()
+
+
+@dataclass
+class ScenarioBatch:
+    """Same fields as the batches yielded by art.utils.iterate_dataset"""
+    step: int
+    epoch: int
+    epoch_step: int
+    items: List
+
+
+class AdaptiveScenarioSampler:
+    def __init__(
+        self,
+        scenarios: Sequence,
+        store: ScenarioStatsStore,
+        groups_per_step: int = 2,
+        num_epochs: int = 1,
+        rollouts_per_group: int = 4,
+        min_attempts: Optional[int] = None,
+        saturated_low: float = 0.0,
+        saturated_high: float = 1.0,
+        revisit_prob: float = 0.1,
+        initial_step: int = 0,
+        seed: int = 42,
+    ):
+        self.scenarios = {s.id: s for s in scenarios}
+        self.store = store
+        self.groups_per_step = groups_per_step
+        self.num_epochs = num_epochs
+        self.rollouts_per_group = rollouts_per_group
+        # 기본값은 한 번의 방문(rollouts_per_group): decay 때문에 더 큰 값은 epoch을 여러 번 지나야 도달한다
+        self.min_attempts = rollouts_per_group if min_attempts is None else min_attempts
+        self.saturated_low = saturated_low
+        self.saturated_high = saturated_high
+        self.revisit_prob = revisit_prob
+        self.rng = random.Random(seed)
+
+        self.step = initial_step
+        self.epoch = 0
+        self.epoch_step = 0
+        self.remaining: List[int] = []  # 이번 epoch에서 아직 뽑지 않은 scenario id
+        self.revisit_epoch: Optional[int] = None  # 모든 scenario가 saturated여서 거르지 않는 epoch
+        self.scenarios_skipped = 0
+        self.rollouts_avoided = 0
+        if initial_step > 0:
+            # 저장된 state 없이 이어서 시작하는 경우: iterate_dataset처럼 step에서 epoch 위치를 계산하고
+            # 이번 epoch에서 이미 쓴 만큼을 제외한 나머지 pool에서 시작한다
+            batches_per_epoch = max(1, math.ceil(len(self.scenarios) / groups_per_step))
+            self.epoch, self.epoch_step = divmod(initial_step, batches_per_epoch)
+            if self.epoch_step:
+                pool = list(self.scenarios)
+                self.rng.shuffle(pool)
+                self.remaining = pool[self.epoch_step * groups_per_step:]
+
+    def _is_saturated(self, attempts: float, successes: float) -> bool:
+        if attempts < self.min_attempts:
+            return False
+        rate = successes / attempts
+        return rate <= self.saturated_low or rate >= self.saturated_high
+
+    @staticmethod
+    def _priority(attempts: float, successes: float) -> float:
+        # Beta(1, 1) prior의 평균 p에 대해 p(1-p): 50% 근처가 가장 유익하다
+        p = (successes + 1) / (attempts + 2)
+        return p * (1 - p) + 0.01
+
+    def _next_items(self) -> List:
+        stats = self.store.get(self.remaining)
+        candidates, skipped = [], []
+        for scenario_id in self.remaining:
+            attempts, successes = stats.get(scenario_id, (0, 0.0))
+            priority = self._priority(attempts, successes)
+            if (
+                self.revisit_epoch != self.epoch
+                and self._is_saturated(attempts, successes)
+                and self.rng.random() >= self.revisit_prob
+            ):
+                skipped.append((scenario_id, priority))
+            else:
+                candidates.append((scenario_id, priority))
+
+        if not candidates and skipped and self.epoch_step == 0:
+            # epoch 전체가 saturated면 학습이 조용히 끝나지 않도록 이번 epoch은 전부 다시 방문한다
+            print(
+                f"All {len(skipped)} scenarios are saturated at epoch {self.epoch}; "
+                f"revisiting them instead of skipping the epoch"
+            )
+            self.revisit_epoch = self.epoch
+            candidates, skipped = skipped, []
+        self.scenarios_skipped += len(skipped)
+        self.rollouts_avoided += len(skipped) * self.rollouts_per_group
+
+        # 가중치 비복원 추출 (Efraimidis-Spirakis)
+        candidates.sort(key=lambda c: self.rng.random() ** (1 / c[1]), reverse=True)
+        chosen = [scenario_id for scenario_id, _ in candidates[:self.groups_per_step]]
+        self.remaining = [scenario_id for scenario_id, _ in candidates[self.groups_per_step:]]
+        return [self.scenarios[scenario_id] for scenario_id in chosen]
+
+    def state_dict(self) -> Dict:
+        """Position and RNG state; restoring it makes a resumed run pick the same batches"""
+        version, internal, gauss = self.rng.getstate()
+        return {
+            "step": self.step,
+            "epoch": self.epoch,
+            "epoch_step": self.epoch_step,
+            "remaining": list(self.remaining),
+            "rng": [version, list(internal), gauss],
+            "scenarios_skipped": self.scenarios_skipped,
+            "rollouts_avoided": self.rollouts_avoided,
+            "revisit_epoch": self.revisit_epoch,
+        }
+
+    def load_state_dict(self, state: Dict) -> None:
+        self.step = state["step"]
+        self.epoch = state["epoch"]
+        self.epoch_step = state["epoch_step"]
+        self.remaining = [scenario_id for scenario_id in state["remaining"] if scenario_id in self.scenarios]
+        version, internal, gauss = state["rng"]
+        self.rng.setstate((version, tuple(internal), gauss))
+        self.scenarios_skipped = state.get("scenarios_skipped", 0)
+        self.rollouts_avoided = state.get("rollouts_avoided", 0)
+        self.revisit_epoch = state.get("revisit_epoch")
+
+    def __iter__(self) -> Iterator[ScenarioBatch]:
+        while self.epoch < self.num_epochs:
+            if not self.remaining and self.epoch_step == 0:
+                self.remaining = list(self.scenarios)
+            items = self._next_items() if self.remaining else []
+            if not items:
+                self.epoch += 1
+                self.epoch_step = 0
+                continue
+            batch = ScenarioBatch(step=self.step, epoch=self.epoch, epoch_step=self.epoch_step, items=items)
+            # 위치를 먼저 갱신해 두면 loop 안에서 저장한 state_dict가 "다음 batch"를 가리킨다
+            self.step += 1
+            self.epoch_step += 1
+            if not self.remaining:
+                self.epoch += 1
+                self.epoch_step = 0
+            yield batch
@@ -0,0 +1,157 @@
+"""Straggler-aware replacement for art.gather_trajectory_groups.
+
+Every group runs `rollouts_per_group` rollouts. Once `quorum` of them have finished, the
+rest get `straggler_grace_s` more seconds and are then cancelled, so a step waits for
+roughly the median rollout instead of the one that wandered to the recursion limit.
+With `max_concurrency` set, groups whose scenarios were slow in earlier steps acquire
+rollout slots first, so the longest groups do not start last and set the step's tail.
+(Without a concurrency bound every rollout starts immediately and the order is moot.)
+"""
+import asyncio
+import statistics
+import time
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+import art
+from tqdm import tqdm
+
+T = TypeVar("T")
+
+
+@dataclass
+class SchedulerStats:
+    rollouts_started: int = 0
+    rollouts_completed: int = 0
+    rollouts_timed_out: int = 0
+    stragglers_cancelled: int = 0
+    rollout_errors: int = 0
+    groups_dropped: int = 0
+    rollout_durations: List[float] = field(default_factory=list)
+
+    def as_metrics(self) -> Dict[str, float]:
+        metrics = {k: v for k, v in asdict(self).items() if k != "rollout_durations"}
+        if self.rollout_durations:
+            durations = sorted(self.rollout_durations)
+            metrics["rollout_median_s"] = statistics.median(durations)
+            metrics["rollout_max_s"] = durations[-1]
+        return metrics
+
+
+class DurationEstimator:
+    """Exponential moving average of rollout wall-clock time per scenario.
+
+    Timed-out and cancelled rollouts are recorded with the time they had run when they were
+    stopped (a lower bound), so slow scenarios are not estimated from their fast rollouts only.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self._ema: Dict[Hashable, float] = {}
+
+    def update(self, key: Hashable, seconds: float) -> None:
+        previous = self._ema.get(key)
+        self._ema[key] = seconds if previous is None else self.alpha * seconds + (1 - self.alpha) * previous
+
+    def expected(self, key: Hashable) -> float:
+        # 처음 보는 scenario는 가장 오래 걸린다고 가정하고 먼저 보낸다
+        return self._ema.get(key, float("inf"))
+
+
+async def gather_groups_with_quorum(
+    items: Sequence[T],
+    rollout_fn: Callable[[T], Awaitable[art.Trajectory]],
+    rollouts_per_group: int,
+    quorum: Optional[int] = None,
+    rollout_timeout_s: Optional[float] = None,
+    straggler_grace_s: float = 0.0,
+    max_concurrency: Optional[int] = None,
+    max_exceptions: Optional[int] = None,
+    min_group_size: int = 2,
+    durations: Optional[DurationEstimator] = None,
+    key: Callable[[T], Hashable] = lambda item: item.id,
+    pbar_desc: str = "gather",
+) -> Tuple[List[art.TrajectoryGroup], SchedulerStats]:
+    """Run one trajectory group per item and return the finished groups with scheduling stats.
+
+    Groups keep the order of `items`; groups left with fewer than `min_group_size`
+    trajectories are dropped. Raises RuntimeError when more than `max_exceptions`
+    rollouts fail (timeouts and cancelled stragglers are not counted as failures).
+    """
+    quorum = min(quorum or rollouts_per_group, rollouts_per_group)
+    durations = durations or DurationEstimator()
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    stats = SchedulerStats()
+    pbar = tqdm(total=len(items) * rollouts_per_group, desc=pbar_desc)
+
+    async def run_one(item: T) -> Optional[art.Trajectory]:
+        try:
+            async with semaphore or nullcontext():
+                stats.rollouts_started += 1
+                start = time.perf_counter()
+                try:
+                    traj = await asyncio.wait_for(rollout_fn(item), timeout=rollout_timeout_s)
+                except asyncio.TimeoutError:
+                    stats.rollouts_timed_out += 1
+                    durations.update(key(item), time.perf_counter() - start)
+                    return None
+                except asyncio.CancelledError:
+                    # quorum 이후 잘린 straggler: 여기까지 걸린 시간을 추정치에 반영한다
+                    durations.update(key(item), time.perf_counter() - start)
+                    raise
+                except Exception as e:
+                    stats.rollout_errors += 1
+                    print(f"Rollout failed for {key(item)}: {e}")
+                    if max_exceptions is not None and stats.rollout_errors > max_exceptions:
+                        raise RuntimeError(f"Too many rollout exceptions ({stats.rollout_errors})") from e
+                    return None
+                elapsed = time.perf_counter() - start
+                durations.update(key(item), elapsed)
+                stats.rollouts_completed += 1
+                stats.rollout_durations.append(elapsed)
+                traj.metrics["rollout_wall_s"] = elapsed
+                return traj
+        finally:
+            pbar.update(1)
+
+    async def run_group(tasks: List[asyncio.Task]) -> List[art.Trajectory]:
+        finished: List[art.Trajectory] = []
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            finished.extend(t for t in (task.result() for task in done) if t is not None)
+            if len(finished) >= quorum and pending:
+                if straggler_grace_s > 0:
+                    done, pending = await asyncio.wait(pending, timeout=straggler_grace_s)
+                    finished.extend(t for t in (task.result() for task in done) if t is not None)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                stats.stragglers_cancelled += len(pending)
+                break
+        return finished
+
+    # 예상 소요 시간이 긴 group부터 task를 만들어 semaphore를 먼저 잡게 한다 (max_concurrency가 있을 때만 의미가 있음)
+    order = sorted(range(len(items)), key=lambda i: durations.expected(key(items[i])), reverse=True)
+    group_tasks: Dict[int, List[asyncio.Task]] = {
+        i: [asyncio.create_task(run_one(items[i])) for _ in range(rollouts_per_group)] for i in order
+    }
+    try:
+        results = await asyncio.gather(*(run_group(group_tasks[i]) for i in range(len(items))))
+    except BaseException:
+        for tasks in group_tasks.values():
+            for task in tasks:
+                task.cancel()
+        raise
+    finally:
+        pbar.set_postfix(cancelled=stats.stragglers_cancelled, timed_out=stats.rollouts_timed_out)
+        pbar.close()
+
+    groups = []
+    for trajectories in results:
+        if len(trajectories) < min_group_size:
+            stats.groups_dropped += 1
+            continue
+        groups.append(art.TrajectoryGroup(trajectories=trajectories))
+    return groups, stats
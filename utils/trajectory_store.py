@@ -0,0 +1,204 @@
+"""Columnar (Parquet) store for judged trajectories and an off-policy replay buffer.
+
+Every training step writes one `step_000123.parquet` file with one row per trajectory:
+step, group index, scenario id, reward, metrics, metadata, logs and the serialized
+messages, tool schemas and additional histories, so a replayed trajectory tokenizes to the
+same prompt that was judged.
+`ReplayBuffer` reads the last few steps back and returns the most informative groups
+(largest RULER reward spread) so they can be mixed into the next `model.train` batch.
+"""
+import json
+import os
+import statistics
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import art
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+TRAJECTORY_SCHEMA = pa.schema([
+    ("step", pa.int32()),
+    ("group_index", pa.int32()),
+    ("scenario_id", pa.int64()),
+    ("reward", pa.float64()),
+    ("metrics", pa.map_(pa.string(), pa.float64())),
+    ("metadata", pa.string()),  # JSON
+    ("messages", pa.string()),  # JSON; Choice objects are tagged with "__choice__"
+    ("tools", pa.string()),  # JSON, null when the trajectory has no tool schema
+    ("additional_histories", pa.string()),  # JSON list of {"messages": ..., "tools": ...}
+    ("logs", pa.list_(pa.string())),
+])
+
+
+def serialize_messages(messages_and_choices: Sequence) -> str:
+    items = []
+    for item in messages_and_choices:
+        if hasattr(item, "model_dump"):
+            # 학습 대상인 Choice (logprobs 포함)는 복원할 수 있도록 표시해 둔다
+            items.append({"__choice__": item.model_dump()})
+        else:
+            items.append(item)
+    return json.dumps(items, default=str)
+
+
+def deserialize_messages(payload: str) -> List:
+    return _restore_choices(json.loads(payload))
+
+
+def _restore_choices(items: List) -> List:
+    from openai.types.chat.chat_completion import Choice
+
+    return [
+        Choice.model_validate(item["__choice__"]) if isinstance(item, dict) and "__choice__" in item else item
+        for item in items
+    ]
+
+
+def serialize_histories(histories: Sequence) -> str:
+    return json.dumps([
+        {"messages": json.loads(serialize_messages(history.messages_and_choices)), "tools": history.tools}
+        for history in histories
+    ], default=str)
+
+
+def deserialize_histories(payload: Optional[str]) -> List:
+    from art.trajectories import History
+
+    return [
+        History(messages_and_choices=_restore_choices(item["messages"]), tools=item["tools"])
+        for item in json.loads(payload or "[]")
+    ]
+
+
+class TrajectoryStore:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, step: int) -> str:
+        return os.path.join(self.root, f"step_{step:06d}.parquet")
+
+    def append(self, step: int, groups: Sequence[art.TrajectoryGroup]) -> int:
+        """Write all trajectories of a step; returns the number of rows written"""
+        rows: Dict[str, list] = {name: [] for name in TRAJECTORY_SCHEMA.names}
+        for group_index, group in enumerate(groups):
+            for traj in group.trajectories:
+                rows["step"].append(step)
+                rows["group_index"].append(group_index)
+                rows["scenario_id"].append(traj.metadata.get("scenario_id"))
+                rows["reward"].append(float(traj.reward))
+                rows["metrics"].append([
+                    (k, float(v)) for k, v in traj.metrics.items() if isinstance(v, (int, float))
+                ])
+                rows["metadata"].append(json.dumps(traj.metadata, default=str))
+                rows["messages"].append(serialize_messages(traj.messages_and_choices))
+                rows["tools"].append(json.dumps(traj.tools, default=str) if traj.tools else None)
+                rows["additional_histories"].append(serialize_histories(traj.additional_histories))
+                rows["logs"].append([str(log) for log in traj.logs])
+        if not rows["step"]:
+            return 0
+
+        table = pa.Table.from_pydict(rows, schema=TRAJECTORY_SCHEMA)
+        tmp_path = f"{self._path(step)}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, self._path(step))
+        return table.num_rows
+
+    def steps(self) -> List[int]:
+        return sorted(
+            int(name[len("step_"):-len(".parquet")])
+            for name in os.listdir(self.root)
+            if name.startswith("step_") and name.endswith(".parquet")
+        )
+
+    def read(self, min_step: int = 0, max_step: Optional[int] = None, columns: Optional[List[str]] = None) -> pa.Table:
+        """Read the rows of steps in [min_step, max_step]; files outside the range are never opened"""
+        tables = [
+            pq.read_table(self._path(step), columns=columns)
+            for step in self.steps()
+            if step >= min_step and (max_step is None or step <= max_step)
+        ]
+        if not tables:
+            schema = TRAJECTORY_SCHEMA if columns is None else pa.schema([TRAJECTORY_SCHEMA.field(c) for c in columns])
+            return schema.empty_table()
+        return pa.concat_tables(tables)
+
+
+class ReplayBuffer:
+    """Re-use recent high-value judged groups as extra off-policy training data"""
+
+    def __init__(
+        self,
+        store: TrajectoryStore,
+        max_staleness: int = 2,
+        min_reward_std: float = 0.1,
+        max_replays: int = 1,
+    ):
+        self.store = store
+        self.max_staleness = max_staleness
+        self.min_reward_std = min_reward_std
+        self.max_replays = max_replays
+        self._replays: Dict[Tuple[int, int], int] = {}
+
+    def state_dict(self) -> Dict:
+        """Replay counts, saved in run_state.json so max_replays still holds after a resume"""
+        return {"replays": [[step, group_index, count] for (step, group_index), count in self._replays.items()]}
+
+    def load_state_dict(self, state: Dict) -> None:
+        self._replays = {(step, group_index): count for step, group_index, count in state.get("replays", [])}
+
+    def _forget_old(self, current_step: int) -> None:
+        # max_staleness보다 오래된 group은 다시 뽑히지 않으므로 카운트도 버린다 (run_state.json 크기 유지)
+        self._replays = {
+            key: count for key, count in self._replays.items() if key[0] >= current_step - self.max_staleness
+        }
+
+    def sample(self, current_step: int, num_groups: int) -> List[art.TrajectoryGroup]:
+        """Return up to num_groups groups from the last `max_staleness` steps (current step excluded)"""
+        if num_groups <= 0:
+            return []
+        self._forget_old(current_step)
+        # 점수 계산에 필요한 컬럼만 먼저 읽고, 선택된 group만 messages를 읽는다
+        index = self.store.read(
+            min_step=current_step - self.max_staleness,
+            max_step=current_step - 1,
+            columns=["step", "group_index", "reward"],
+        ).to_pydict()
+
+        rewards: Dict[Tuple[int, int], List[float]] = {}
+        for step, group_index, reward in zip(index["step"], index["group_index"], index["reward"]):
+            rewards.setdefault((step, group_index), []).append(reward)
+
+        candidates = []
+        for key, values in rewards.items():
+            if len(values) < 2 or self._replays.get(key, 0) >= self.max_replays:
+                continue
+            spread = statistics.pstdev(values)
+            if spread >= self.min_reward_std:
+                candidates.append((spread, key))
+        candidates.sort(reverse=True)
+        chosen = [key for _, key in candidates[:num_groups]]
+        if not chosen:
+            return []
+
+        groups = []
+        for step, group_index in chosen:
+            table = self.store.read(min_step=step, max_step=step)
+            rows = table.filter(pc.equal(table["group_index"], group_index)).to_pylist()
+            trajectories = []
+            for row in rows:
+                metrics = dict(row["metrics"])
+                metrics["replayed_from_step"] = float(step)
+                trajectories.append(art.Trajectory(
+                    messages_and_choices=deserialize_messages(row["messages"]),
+                    tools=json.loads(row["tools"]) if row.get("tools") else None,
+                    additional_histories=deserialize_histories(row.get("additional_histories")),
+                    reward=row["reward"],
+                    metrics=metrics,
+                    metadata=json.loads(row["metadata"]),
+                    logs=list(row.get("logs") or []),
+                ))
+            groups.append(art.TrajectoryGroup(trajectories=trajectories))
+            self._replays[(step, group_index)] = self._replays.get((step, group_index), 0) + 1
+        return groups